@@ -1,7 +1,9 @@
 from django.contrib import admin
+
+from .fulltext import search_ids
 from .models import (
     Apartment, Amenity, ApartmentPricing, ApartmentAddress,
-    ApartmentAvailability, ApartmentRule
+    ApartmentAvailability, ApartmentAvailabilityRange, ApartmentRule, ExchangeRate
 )
 
 @admin.register(Amenity)
@@ -20,7 +22,7 @@ class ApartmentPricingInline(admin.StackedInline):
 class ApartmentAddressInline(admin.StackedInline):
     model = ApartmentAddress
     extra = 0
-    fields = ('country', 'state', 'city', 'street')
+    fields = ('country', 'state', 'city', 'street', 'latitude', 'longitude')
 
 
 class ApartmentAvailabilityInline(admin.TabularInline):
@@ -29,6 +31,17 @@ class ApartmentAvailabilityInline(admin.TabularInline):
     fields = ('date', 'is_available')
 
 
+class ApartmentAvailabilityRangeInline(admin.TabularInline):
+    model = ApartmentAvailabilityRange
+    extra = 0
+    fields = ('start_date', 'end_date', 'is_available')
+    readonly_fields = ('start_date', 'end_date', 'is_available')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class ApartmentRuleInline(admin.TabularInline):
     model = ApartmentRule
     extra = 1
@@ -39,16 +52,17 @@ class ApartmentRuleInline(admin.TabularInline):
 class ApartmentAdmin(admin.ModelAdmin):
     list_display = ('title', 'host', 'property_type', 'total_bedrooms', 'total_bathrooms', 'max_guests', 'is_active', 'is_verified', 'created_at')
     list_filter = ('property_type', 'is_active', 'is_verified', 'created_at')
-    search_fields = ('title', 'description', 'host__email', 'host__first_name', 'host__last_name')
-    readonly_fields = ('uploaded_at',)
-    inlines = [ApartmentPricingInline, ApartmentAddressInline, ApartmentAvailabilityInline, ApartmentRuleInline]
+    # Text fields are searched through the full-text index in get_search_results; only exact host email here.
+    search_fields = ('=host__email',)
+    readonly_fields = ('uploaded_at', 'image_status', 'image_variants')
+    inlines = [ApartmentPricingInline, ApartmentAddressInline, ApartmentAvailabilityInline, ApartmentAvailabilityRangeInline, ApartmentRuleInline]
 
     fieldsets = (
         (None, {
             'fields': ('host', 'title', 'description', 'property_type', 'total_bedrooms', 'total_bathrooms', 'max_guests')
         }),
         ('Image', {
-            'fields': ('image', 'is_cover', 'uploaded_at')
+            'fields': ('image', 'image_status', 'image_variants', 'is_cover', 'uploaded_at')
         }),
         ('Status', {
             'fields': ('is_active', 'is_verified')
@@ -60,6 +74,15 @@ class ApartmentAdmin(admin.ModelAdmin):
 
     filter_horizontal = ('amenities',)
 
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return results, may_have_duplicates
+
+        # Title, description and address go through the full-text index (search_ids falls back to
+        # icontains itself on databases without one).
+        return results | queryset.filter(id__in=search_ids(search_term)), may_have_duplicates
+
 
 @admin.register(ApartmentPricing)
 class ApartmentPricingAdmin(admin.ModelAdmin):
@@ -67,6 +90,11 @@ class ApartmentPricingAdmin(admin.ModelAdmin):
     search_fields = ('apartment__title',)
 
 
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'rate', 'updated_at')
+
+
 @admin.register(ApartmentAddress)
 class ApartmentAddressAdmin(admin.ModelAdmin):
     list_display = ('apartment', 'country', 'state', 'city', 'street')
@@ -80,6 +108,23 @@ class ApartmentAvailabilityAdmin(admin.ModelAdmin):
     search_fields = ('apartment__title',)
 
 
+@admin.register(ApartmentAvailabilityRange)
+class ApartmentAvailabilityRangeAdmin(admin.ModelAdmin):
+    # Read-only: runs must stay sorted, non-overlapping and merged, which only availability.set_availability guarantees.
+    list_display = ('apartment', 'start_date', 'end_date', 'is_available')
+    list_filter = ('is_available',)
+    search_fields = ('apartment__title',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ApartmentRule)
 class ApartmentRuleAdmin(admin.ModelAdmin):
     list_display = ('apartment', 'rule_text')
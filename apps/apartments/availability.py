@@ -0,0 +1,316 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .cache import AVAILABILITY_TAG, invalidate_apartments, invalidate_tags
+from .models import ApartmentAvailability, ApartmentAvailabilityRange
+
+
+ONE_DAY = timedelta(days=1)
+
+# Sent once per upsert_availability call, after commit, with `apartment_id` and
+# `ranges`: the (start, end, True) runs the caller marked available (later spans
+# winning), not the stored state of the whole window. Per-night listeners should
+# use this instead of per-row saves.
+availability_updated = Signal()
+
+
+def merge_ranges(ranges):
+    """
+    Sort (start, end, is_available) runs and join touching runs that share a status.
+    """
+    merged = []
+    for start, end, is_available in sorted(ranges):
+        if merged and merged[-1][1] == start and merged[-1][2] == is_available:
+            merged[-1] = (merged[-1][0], end, is_available)
+        else:
+            merged.append((start, end, is_available))
+    return merged
+
+
+def splice_range(ranges, start, end, is_available):
+    """
+    Overwrite [start, end) inside a list of runs. `is_available=None` clears the window.
+    """
+    result = []
+    for r_start, r_end, r_available in ranges:
+        if r_end <= start or r_start >= end:
+            result.append((r_start, r_end, r_available))
+            continue
+        if r_start < start:
+            result.append((r_start, start, r_available))
+        if r_end > end:
+            result.append((end, r_end, r_available))
+
+    if is_available is not None:
+        result.append((start, end, is_available))
+    return merge_ranges(result)
+
+
+def clip_ranges(ranges, start=None, end=None):
+    clipped = []
+    for r_start, r_end, is_available in ranges:
+        if start is not None:
+            r_start = max(r_start, start)
+        if end is not None:
+            r_end = min(r_end, end)
+        if r_start < r_end:
+            clipped.append((r_start, r_end, is_available))
+    return clipped
+
+
+def fill_gaps(ranges, start, end):
+    """
+    Runs covering all of [start, end): nights with no stored status are
+    reported as blocked, as covers_window treats them.
+    """
+    filled = []
+    cursor = start
+    for r_start, r_end, is_available in clip_ranges(sorted(ranges), start, end):
+        if r_start > cursor:
+            filled.append((cursor, r_start, False))
+        filled.append((r_start, r_end, is_available))
+        cursor = r_end
+    if cursor < end:
+        filled.append((cursor, end, False))
+    return merge_ranges(filled)
+
+
+def month_windows(start, end):
+    """
+    Calendar-month [first, next_first) windows overlapping [start, end).
+    """
+    month = start.replace(day=1)
+    while month < end:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        yield month, next_month
+        month = next_month
+
+
+def compress_dates(rows):
+    """
+    Turn (date, is_available) pairs into runs; used to migrate per-day rows.
+    """
+    return merge_ranges((day, day + ONE_DAY, is_available) for day, is_available in rows)
+
+
+def expand_ranges(ranges):
+    """
+    Per-night {date, is_available} dicts, matching ApartmentAvailabilitySerializer output.
+    """
+    days = []
+    for start, end, is_available in ranges:
+        day = start
+        while day < end:
+            days.append({"date": day.isoformat(), "is_available": is_available})
+            day += ONE_DAY
+    return days
+
+
+def _range_tuples(queryset):
+    return [(r.start_date, r.end_date, r.is_available) for r in queryset]
+
+
+def get_availability_ranges(apartment_id, start=None, end=None):
+    """
+    Returns the stored runs for one apartment, clipped to [start, end) when given.
+    """
+    qs = ApartmentAvailabilityRange.objects.filter(apartment_id=apartment_id)
+    if start is not None:
+        qs = qs.filter(end_date__gt=start)
+    if end is not None:
+        qs = qs.filter(start_date__lt=end)
+    return clip_ranges(_range_tuples(qs.order_by("start_date")), start, end)
+
+
+def get_catalog_availability(apartment_ids, start=None, end=None):
+    """
+    Returns {apartment_id: runs} for many apartments in a single query.
+    """
+    qs = ApartmentAvailabilityRange.objects.filter(apartment_id__in=apartment_ids)
+    if start is not None:
+        qs = qs.filter(end_date__gt=start)
+    if end is not None:
+        qs = qs.filter(start_date__lt=end)
+
+    result = defaultdict(list)
+    for r in qs.order_by("apartment_id", "start_date"):
+        result[r.apartment_id].append((r.start_date, r.end_date, r.is_available))
+    return {apartment_id: clip_ranges(ranges, start, end) for apartment_id, ranges in result.items()}
+
+
+def covers_window(ranges, start, end):
+    """
+    True when available runs cover every night in [start, end) without gaps.
+    """
+    cursor = start
+    for r_start, r_end, is_available in sorted(ranges):
+        if r_end <= cursor:
+            continue
+        if r_start > cursor or not is_available:
+            return False
+        cursor = r_end
+        if cursor >= end:
+            return True
+    return cursor >= end
+
+
+def is_available_between(apartment_id, start, end):
+    return covers_window(get_availability_ranges(apartment_id, start, end), start, end)
+
+
+def _clip_to_today(spans, today):
+    return [(max(start, today), end, is_available) for start, end, is_available in spans if end > max(start, today)]
+
+
+def _apply_spans(apartment_ids, spans, today):
+    """
+    Splices `spans` (in order, later ones win) into the stored runs of each
+    apartment. Must run inside a transaction.
+    """
+    window_start = min(start for start, _, _ in spans)
+    window_end = max(end for _, end, _ in spans)
+    existing = list(
+        ApartmentAvailabilityRange.objects
+        .select_for_update()
+        .filter(apartment_id__in=apartment_ids, start_date__lte=window_end, end_date__gte=window_start)
+    )
+
+    touching = defaultdict(list)
+    for r in existing:
+        touching[r.apartment_id].append((r.start_date, r.end_date, r.is_available))
+
+    written = {}
+    new_rows = []
+    for apartment_id in apartment_ids:
+        ranges = touching[apartment_id]
+        for start, end, is_available in spans:
+            ranges = splice_range(ranges, start, end, is_available)
+        written[apartment_id] = ranges
+        new_rows.extend(
+            ApartmentAvailabilityRange(
+                apartment_id=apartment_id,
+                start_date=r_start,
+                end_date=r_end,
+                is_available=r_available,
+            )
+            for r_start, r_end, r_available in ranges
+        )
+
+    if existing:
+        ApartmentAvailabilityRange.objects.filter(pk__in=[r.pk for r in existing]).delete()
+    ApartmentAvailabilityRange.objects.bulk_create(new_rows)
+
+    _prune(ApartmentAvailabilityRange.objects.filter(apartment_id__in=apartment_ids), today)
+    invalidate_apartments(*apartment_ids)
+    return written
+
+
+def set_availability_for_apartments(apartment_ids, start, end, is_available=True):
+    """
+    Writes one status over [start, end) for every apartment given.
+
+    Only runs touching the window are read and rewritten, so the cost is
+    O(ranges) regardless of how many nights the window spans. Past nights
+    are never stored; they are clipped here and pruned for the touched
+    apartments in the same transaction.
+    """
+    apartment_ids = list(apartment_ids)
+    today = timezone.localdate()
+    spans = _clip_to_today([(start, end, is_available)], today)
+    if not spans or not apartment_ids:
+        return {}
+
+    with transaction.atomic():
+        return _apply_spans(apartment_ids, spans, today)
+
+
+def upsert_availability(apartment_id, spans):
+    """
+    Bulk write of (start, end, is_available) spans for one apartment.
+
+    The spans are spliced into the stored runs in one transaction, so the
+    cost is O(spans + touched runs) however many nights they cover. The
+    cache is invalidated once and `availability_updated` is sent once,
+    after commit, when any night was marked available.
+    """
+    today = timezone.localdate()
+    spans = _clip_to_today(spans, today)
+    if not spans:
+        return []
+
+    # What the caller opened, later spans winning, without reading stored runs.
+    submitted = []
+    for start, end, is_available in spans:
+        submitted = splice_range(submitted, start, end, is_available)
+    opened = [run for run in submitted if run[2]]
+
+    window_start = min(start for start, _, _ in spans)
+    window_end = max(end for _, end, _ in spans)
+    with transaction.atomic():
+        ranges = _apply_spans([apartment_id], spans, today)[apartment_id]
+        written = clip_ranges(ranges, window_start, window_end)
+        if opened:
+            transaction.on_commit(lambda: availability_updated.send(
+                sender=ApartmentAvailabilityRange, apartment_id=apartment_id, ranges=opened,
+            ))
+    return written
+
+
+def set_availability(apartment_id, start, end, is_available=True):
+    return set_availability_for_apartments([apartment_id], start, end, is_available).get(apartment_id, [])
+
+
+def clear_availability(apartment_id, start, end):
+    return set_availability(apartment_id, start, end, is_available=None)
+
+
+def _prune(queryset, today):
+    deleted, _ = queryset.filter(end_date__lte=today).delete()
+    queryset.filter(start_date__lt=today, end_date__gt=today).update(start_date=today)
+    return deleted
+
+
+def prune_past_availability(today=None):
+    """
+    Drops runs that ended before today and trims the one straddling it.
+    Two statements for the whole catalog.
+    """
+    deleted = _prune(ApartmentAvailabilityRange.objects.all(), today or timezone.localdate())
+    invalidate_tags(AVAILABILITY_TAG)
+    return deleted
+
+
+def rebuild_ranges_from_rows(apartment_ids=None):
+    """
+    Rebuilds runs from legacy per-day ApartmentAvailability rows.
+    """
+    rows = ApartmentAvailability.objects.filter(date__gte=timezone.localdate())
+    ranges = ApartmentAvailabilityRange.objects.all()
+    if apartment_ids is not None:
+        rows = rows.filter(apartment_id__in=apartment_ids)
+        ranges = ranges.filter(apartment_id__in=apartment_ids)
+
+    per_apartment = defaultdict(list)
+    for apartment_id, day, is_available in rows.values_list("apartment_id", "date", "is_available"):
+        per_apartment[apartment_id].append((day, is_available))
+
+    new_rows = [
+        ApartmentAvailabilityRange(
+            apartment_id=apartment_id,
+            start_date=start,
+            end_date=end,
+            is_available=is_available,
+        )
+        for apartment_id, days in per_apartment.items()
+        for start, end, is_available in compress_dates(days)
+    ]
+
+    with transaction.atomic():
+        ranges.delete()
+        ApartmentAvailabilityRange.objects.bulk_create(new_rows, batch_size=1000)
+        invalidate_tags(AVAILABILITY_TAG)
+    return len(new_rows)
@@ -0,0 +1,261 @@
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import local_cache
+from .local_cache import MISS
+
+STALE_TTL = 60 * 5
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 3
+LOCK_POLL_INTERVAL = 0.05
+EARLY_REFRESH_BETA = 1.0
+
+CATALOG_TAG = "catalog"
+AMENITIES_TAG = "amenities"
+AVAILABILITY_TAG = "availability"
+
+LIST_TAGS = (CATALOG_TAG, AMENITIES_TAG, AVAILABILITY_TAG)
+
+
+def apartment_tag(apartment_id):
+    return f"apartment:{apartment_id}"
+
+
+def detail_tags(apartment_id):
+    return (apartment_tag(apartment_id), AMENITIES_TAG, AVAILABILITY_TAG)
+
+
+def _tag_key(tag):
+    return f"apartments:tag:{tag}"
+
+
+def _new_version():
+    # Time-based so a tag that was evicted never comes back with a version an old entry still carries.
+    return time.time_ns()
+
+
+def _lookup(key, tags):
+    """
+    Returns (entry, versions): the raw entry and current tag versions, read in one get_many.
+    """
+    tag_keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many([key, *tag_keys])
+    _init_missing_versions(found, tag_keys)
+    return found.get(key), tuple(found[tag_key] for tag_key in tag_keys)
+
+
+def tag_version(tag):
+    """
+    Current version of `tag`; it changes whenever any process bumps the tag.
+    """
+    tag_key = _tag_key(tag)
+    found = cache.get_many([tag_key])
+    _init_missing_versions(found, [tag_key])
+    return found[tag_key]
+
+
+def _init_missing_versions(found, tag_keys):
+    missing = [tag_key for tag_key in tag_keys if found.get(tag_key) is None]
+    if missing:
+        for tag_key in missing:
+            cache.add(tag_key, _new_version(), None)
+        found.update(cache.get_many(missing))
+
+
+def get_tagged(key, tags):
+    """
+    Returns (value, versions). An entry written under older tag versions
+    counts as a miss (MISS). Pass `versions` back to set_tagged so a
+    concurrent bump is never masked.
+    """
+    use_local = local_cache.enabled()
+    if use_local:
+        value = local_cache.tier.get(key)
+        if value is not MISS:
+            return value, None
+        generation = local_cache.tier.generation()
+
+    entry, versions = _lookup(key, tags)
+    if entry is not None and entry[0] == versions:
+        if use_local:
+            local_cache.tier.set(key, entry[1], tags, generation)
+        return entry[1], versions
+    return MISS, versions
+
+
+def _entry(value, versions, timeout, delta=0.0):
+    # (tag versions, value, soft expiry, recompute seconds); kept past soft expiry for STALE_TTL.
+    return (versions, value, time.time() + timeout, delta)
+
+
+def set_tagged(key, value, versions, timeout, delta=0.0):
+    cache.set(key, _entry(value, versions, timeout, delta), timeout + STALE_TTL)
+
+
+def set_many_tagged(values, versions, timeout):
+    cache.set_many(
+        {key: _entry(value, versions, timeout) for key, value in values.items()},
+        timeout + STALE_TTL,
+    )
+
+
+def stale_keys(keys_tags, force=False):
+    """
+    Returns {key: versions} for the keys in `keys_tags` ({key: tags}) whose
+    entry is missing, written under older tag versions or past its soft
+    expiry (every key with `force`). Entries and tag versions are read in
+    one get_many.
+    """
+    tag_keys = {tag: _tag_key(tag) for tags in keys_tags.values() for tag in tags}
+    found = cache.get_many([*keys_tags, *tag_keys.values()])
+    _init_missing_versions(found, list(tag_keys.values()))
+
+    now = time.time()
+    stale = {}
+    for key, tags in keys_tags.items():
+        versions = tuple(found[tag_keys[tag]] for tag in tags)
+        entry = found.get(key)
+        if force or entry is None or entry[0] != versions or len(entry) != 4 or entry[2] <= now:
+            stale[key] = versions
+    return stale
+
+
+def set_many_versioned(values, timeout):
+    """
+    Writes {key: (value, versions)} in one set_many (a single pipeline on Redis).
+    """
+    cache.set_many(
+        {key: _entry(value, versions, timeout) for key, (value, versions) in values.items()},
+        timeout + STALE_TTL,
+    )
+
+
+def _refresh_early(entry, now):
+    """
+    XFetch: refresh before the soft expiry with a probability that grows as it
+    nears and with how long the value takes to compute.
+    """
+    if len(entry) != 4:
+        return True
+    _, _, refresh_at, delta = entry
+    return now - delta * EARLY_REFRESH_BETA * math.log(random.random() or 1e-12) >= refresh_at
+
+
+_local_locks = weakref.WeakValueDictionary()
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def _acquire_shared_lock(key):
+    token = uuid.uuid4().hex
+    return token if cache.add(f"{key}:lock", token, LOCK_TIMEOUT) else None
+
+
+def _release_shared_lock(key, token):
+    if cache.get(f"{key}:lock") == token:
+        cache.delete(f"{key}:lock")
+
+
+def _wait_for_fill(key, tags):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value, _ = get_tagged(key, tags)
+        if value is not MISS:
+            return value
+    return MISS
+
+
+def read_through(key, tags, compute, timeout):
+    """
+    Cached read through the in-process tier, then the shared cache, with
+    stampede protection.
+
+    Fresh entries are returned directly, apart from a probabilistic early
+    refresh just before they expire. Otherwise a single caller per key
+    recomputes: a thread lock coalesces callers in this process and a
+    cache.add lock (SET NX on Redis) coalesces workers. Everyone else is
+    served the stale value when one exists, or waits briefly for the
+    winner to fill the cache.
+    """
+    use_local = local_cache.enabled()
+    if use_local:
+        value = local_cache.tier.get(key)
+        if value is not MISS:
+            return value
+        generation = local_cache.tier.generation()
+
+    entry, versions = _lookup(key, tags)
+    if entry is not None and entry[0] == versions and not _refresh_early(entry, time.time()):
+        if use_local:
+            local_cache.tier.set(key, entry[1], tags, generation)
+        return entry[1]
+    stale = entry[1] if entry is not None else MISS
+
+    local = _local_lock(key)
+    if not local.acquire(blocking=stale is MISS, timeout=LOCK_WAIT if stale is MISS else -1):
+        if stale is not MISS:
+            return stale
+        return compute()
+
+    token = None
+    try:
+        if stale is MISS:
+            # Another thread here may have filled it while we waited on the local lock.
+            value, versions = get_tagged(key, tags)
+            if value is not MISS:
+                return value
+
+        token = _acquire_shared_lock(key)
+        if token is None:
+            if stale is not MISS:
+                return stale
+            value = _wait_for_fill(key, tags)
+            if value is not MISS:
+                return value
+
+        started = time.monotonic()
+        value = compute()
+        set_tagged(key, value, versions, timeout, time.monotonic() - started)
+        if use_local:
+            local_cache.tier.set(key, value, tags, generation)
+        return value
+    finally:
+        if token is not None:
+            _release_shared_lock(key, token)
+        local.release()
+
+
+def bump_tags(*tags):
+    """
+    Invalidates every entry carrying any of `tags`: one INCR per tag, no key scans.
+    """
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            cache.set(_tag_key(tag), _new_version(), None)
+    local_cache.broadcast_invalidation(tags)
+
+
+def invalidate_tags(*tags):
+    # Bump after commit so readers can't re-cache pre-commit rows under the new version.
+    transaction.on_commit(lambda: bump_tags(*tags))
+
+
+def invalidate_apartments(*apartment_ids):
+    invalidate_tags(CATALOG_TAG, *(apartment_tag(apartment_id) for apartment_id in apartment_ids))
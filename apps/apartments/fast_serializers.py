@@ -0,0 +1,127 @@
+from operator import attrgetter
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Manager
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject, RelatedField
+
+from .serializers import AmenitySerializer, ApartmentSerializer
+
+# Fields whose to_representation is the identity for the values models hold.
+_PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+
+def _overrides_representation(serializer, base):
+    return type(serializer).to_representation is not base.to_representation
+
+
+def _getter(field):
+    get = attrgetter(".".join(field.source_attrs))
+
+    def read(obj):
+        try:
+            return get(obj)
+        except ObjectDoesNotExist:
+            return None
+    return read
+
+
+def _extractor(field):
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    if isinstance(field, serializers.ListSerializer) and _overrides_representation(field, serializers.ListSerializer):
+        read = _getter(field)
+
+        def extract(obj):
+            return field.to_representation(read(obj))
+        return extract
+
+    if isinstance(field, serializers.ListSerializer):
+        item, read = compile_serializer(field.child), _getter(field)
+
+        def extract(obj):
+            items = read(obj)
+            if isinstance(items, Manager):
+                items = items.all()
+            return [item(value) for value in items]
+        return extract
+
+    if isinstance(field, serializers.BaseSerializer):
+        nested, read = compile_serializer(field), _getter(field)
+
+        def extract(obj):
+            value = read(obj)
+            return None if value is None else nested(value)
+        return extract
+
+    if field.source == "*" or isinstance(field, serializers.ModelField):
+        # Both read from the whole object rather than one attribute.
+        return field.to_representation
+
+    if isinstance(field, RelatedField) and field.use_pk_only_optimization():
+        source, represent = field.source_attrs[-1], field.to_representation
+        parent = attrgetter(".".join(field.source_attrs[:-1])) if len(field.source_attrs) > 1 else None
+
+        def extract(obj):
+            owner = parent(obj) if parent is not None else obj
+            pk = owner.serializable_value(source)
+            return None if pk is None else represent(PKOnlyObject(pk=pk))
+        return extract
+
+    read = _getter(field)
+    if type(field) in _PASSTHROUGH_FIELDS:
+        return read
+
+    represent = field.to_representation
+
+    def extract(obj):
+        value = read(obj)
+        return None if value is None else represent(value)
+    return extract
+
+
+def compile_serializer(serializer):
+    """
+    Precompiles a read-only serializer (class or instance) into a function
+    returning the same dict as `serializer.to_representation(obj)`.
+
+    Field lookup, source resolution and nested serializer setup happen once
+    here; per object only the attribute reads and value conversions remain.
+    Works on model instances as well as on the snapshots in .snapshots.
+
+    A serializer that overrides to_representation (such as the display
+    currency in ApartmentPricingSerializer) is not compiled: its own
+    to_representation is returned, so nested ones keep their behaviour.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if _overrides_representation(serializer, serializers.Serializer):
+        return serializer.to_representation
+    extractors = [(field.field_name, _extractor(field)) for field in serializer._readable_fields]
+
+    def serialize(obj):
+        return {name: extract(obj) for name, extract in extractors}
+    return serialize
+
+
+class FastApartmentSerializer(ApartmentSerializer):
+    """
+    ApartmentSerializer with the per-object amenity serializer replaced by a compiled one.
+    """
+    _amenity = staticmethod(compile_serializer(AmenitySerializer))
+
+    def get_apartment_amenities(self, obj):
+        return [self._amenity(amenity) for amenity in obj.amenities.all()]
+
+
+serialize_apartment = compile_serializer(FastApartmentSerializer)
+
+
+def serialize_apartments(apartments):
+    return [serialize_apartment(apartment) for apartment in apartments]
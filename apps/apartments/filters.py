@@ -0,0 +1,98 @@
+import django_filters
+from django.db.models import Case, IntegerField, When
+from rest_framework.exceptions import ValidationError
+
+from .fulltext import search_ids
+from .geo import within_bbox, within_radius
+from .fx import base_currency, to_base
+from .models import CURRENCY, Apartment
+from .search import filter_all_amenities, normalize_term
+
+MAX_RADIUS_KM = 500
+
+
+class ApartmentSearchFilter(django_filters.FilterSet):
+    """
+    Every filter targets the denormalized ApartmentSearchIndex row, so the
+    composite indexes there serve the query without joining pricing/address.
+    Prices are compared and sorted in the base currency (price_base).
+    """
+    q = django_filters.CharFilter(method="filter_text")
+    city = django_filters.CharFilter(method="filter_city")
+    country = django_filters.CharFilter(method="filter_country")
+    currency = django_filters.ChoiceFilter(
+        choices=CURRENCY, method="filter_currency", help_text="Currency of min_price/max_price and display prices."
+    )
+    min_price = django_filters.NumberFilter(method="filter_min_price")
+    max_price = django_filters.NumberFilter(method="filter_max_price")
+    guests = django_filters.NumberFilter(field_name="search_index__max_guests", lookup_expr="gte")
+    bedrooms = django_filters.NumberFilter(field_name="search_index__total_bedrooms", lookup_expr="gte")
+    property_type = django_filters.CharFilter(field_name="search_index__property_type")
+    amenities = django_filters.BaseInFilter(method="filter_amenities")
+    near = django_filters.BaseCSVFilter(method="filter_near", help_text="lat,lng,radius_km")
+    bbox = django_filters.BaseCSVFilter(method="filter_bbox", help_text="south,west,north,east")
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ("search_index__price_base", "price"),
+            ("search_index__created_at", "created_at"),
+        )
+    )
+
+    class Meta:
+        model = Apartment
+        fields = []
+
+    def filter_text(self, queryset, name, value):
+        ranked_ids = search_ids(value)
+        if not ranked_ids:
+            return queryset.none()
+        rank = Case(
+            *[When(id=apartment_id, then=position) for position, apartment_id in enumerate(ranked_ids)],
+            output_field=IntegerField(),
+        )
+        # An explicit ?ordering= is applied after this and takes precedence over relevance.
+        return queryset.filter(id__in=ranked_ids).order_by(rank)
+
+    def filter_currency(self, queryset, name, value):
+        # Only qualifies the price filters and the rendered prices.
+        return queryset
+
+    def _price_bound(self, value):
+        currency = self.form.cleaned_data.get("currency") or base_currency()
+        return to_base(value, currency)
+
+    def filter_min_price(self, queryset, name, value):
+        return queryset.filter(search_index__price_base__gte=self._price_bound(value))
+
+    def filter_max_price(self, queryset, name, value):
+        return queryset.filter(search_index__price_base__lte=self._price_bound(value))
+
+    def filter_city(self, queryset, name, value):
+        return queryset.filter(search_index__city=normalize_term(value))
+
+    def filter_country(self, queryset, name, value):
+        return queryset.filter(search_index__country=normalize_term(value))
+
+    def filter_near(self, queryset, name, value):
+        try:
+            lat, lng, radius_km = (float(v) for v in value)
+        except (TypeError, ValueError):
+            raise ValidationError({"near": "Expected lat,lng,radius_km."})
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 0 < radius_km <= MAX_RADIUS_KM):
+            raise ValidationError({"near": "Coordinates or radius out of range."})
+        return within_radius(queryset, lat, lng, radius_km)
+
+    def filter_bbox(self, queryset, name, value):
+        try:
+            south, west, north, east = (float(v) for v in value)
+        except (TypeError, ValueError):
+            raise ValidationError({"bbox": "Expected south,west,north,east."})
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise ValidationError({"bbox": "Coordinates out of range."})
+        return within_bbox(queryset, south, west, north, east)
+
+    def filter_amenities(self, queryset, name, value):
+        amenity_ids = [int(v) for v in value if str(v).isdigit()]
+        if not amenity_ids:
+            return queryset
+        return filter_all_amenities(queryset, amenity_ids)
@@ -0,0 +1,122 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Apartment
+
+FTS_TABLE = "apartments_apartment_fts"
+FULLTEXT_MAX_RESULTS = 1000
+
+# Column weights for bm25 on SQLite: title, description, city, state, country, street.
+SQLITE_WEIGHTS = (10.0, 1.0, 4.0, 2.0, 2.0, 1.0)
+DOCUMENT_FIELDS = ("title", "description", "address__city", "address__state", "address__country", "address__street")
+
+
+def is_supported(vendor=None):
+    return (vendor or connection.vendor) in ("sqlite", "postgresql")
+
+
+def index_documents(apartment_ids):
+    """
+    (Re)indexes the given apartments. Deleted ids are dropped from the index.
+    """
+    apartment_ids = [int(i) for i in apartment_ids]
+    if not apartment_ids or not is_supported():
+        return
+
+    if connection.vendor == "postgresql":
+        _index_postgresql(apartment_ids)
+        return
+
+    rows = Apartment.objects.filter(id__in=apartment_ids).values_list("id", *DOCUMENT_FIELDS)
+    with connection.cursor() as cursor:
+        _delete_sqlite(cursor, apartment_ids)
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, city, state, country, street) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [tuple(value or "" for value in row) for row in rows],
+        )
+
+
+def _index_postgresql(apartment_ids):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE} (apartment_id, document)
+            SELECT a.id,
+                   setweight(to_tsvector('english', coalesce(a.title, '')), 'A')
+                || setweight(to_tsvector('simple', concat_ws(' ', ad.city, ad.state, ad.country)), 'B')
+                || setweight(to_tsvector('english', coalesce(a.description, '')), 'C')
+                || setweight(to_tsvector('simple', coalesce(ad.street, '')), 'D')
+            FROM apartments_apartment a
+            LEFT JOIN apartments_apartmentaddress ad ON ad.apartment_id = a.id
+            WHERE a.id = ANY(%s)
+            ON CONFLICT (apartment_id) DO UPDATE SET document = EXCLUDED.document
+            """,
+            [apartment_ids],
+        )
+
+
+def _delete_sqlite(cursor, apartment_ids):
+    placeholders = ", ".join(["%s"] * len(apartment_ids))
+    cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", apartment_ids)
+
+
+def remove_documents(apartment_ids):
+    apartment_ids = [int(i) for i in apartment_ids]
+    if not apartment_ids or not is_supported():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            _delete_sqlite(cursor, apartment_ids)
+        else:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE apartment_id = ANY(%s)", [apartment_ids])
+
+
+def rebuild_fulltext_index(batch_size=1000):
+    ids = list(Apartment.objects.order_by("id").values_list("id", flat=True))
+    for offset in range(0, len(ids), batch_size):
+        index_documents(ids[offset:offset + batch_size])
+    return len(ids)
+
+
+def _sqlite_match_expression(query):
+    # Quote every token so user input can never be parsed as FTS5 syntax; prefix-match the terms.
+    tokens = re.findall(r"\w+", query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_ids(query, limit=FULLTEXT_MAX_RESULTS):
+    """
+    Returns apartment ids matching `query`, best match first.
+    """
+    query = (query or "").strip()
+    if not query:
+        return []
+
+    if not is_supported():
+        matches = Q()
+        for field in DOCUMENT_FIELDS:
+            matches |= Q(**{f"{field}__icontains": query})
+        return list(Apartment.objects.filter(matches).values_list("id", flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            expression = _sqlite_match_expression(query)
+            if not expression:
+                return []
+            weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+                [expression, limit],
+            )
+        else:
+            cursor.execute(
+                f"SELECT apartment_id FROM {FTS_TABLE}, websearch_to_tsquery('english', %s) query "
+                "WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC LIMIT %s",
+                [query, limit],
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,116 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Round
+
+from .cache import invalidate_tags, tag_version
+from .models import ApartmentSearchIndex, ExchangeRate
+
+CENTS = Decimal("0.01")
+FX_CACHE_TTL = 60 * 5
+# How often a process compares its rates with the shared FX tag version.
+FX_VERSION_CHECK_INTERVAL = 5
+FX_TAG = "fx"
+
+_rates = None
+_version = None
+_loaded_at = 0.0
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def base_currency():
+    return settings.BASE_CURRENCY
+
+
+def get_rates():
+    """
+    {currency: value in the base currency}, read from ExchangeRate at most
+    once per FX_CACHE_TTL per process, and again as soon as the shared FX tag
+    shows another process changed them. The base currency is always 1, and
+    non-positive rates are skipped so conversions never divide by zero.
+    """
+    global _rates, _version, _loaded_at, _checked_at
+    rates = _rates
+    now = time.monotonic()
+    if rates is not None and now - _loaded_at < FX_CACHE_TTL and now - _checked_at < FX_VERSION_CHECK_INTERVAL:
+        return rates
+    with _lock:
+        # Read the version before the rows, so a change landing in between triggers another reload.
+        version = tag_version(FX_TAG)
+        now = time.monotonic()
+        if _rates is None or version != _version or now - _loaded_at >= FX_CACHE_TTL:
+            rates = dict(ExchangeRate.objects.filter(rate__gt=0).values_list("currency", "rate"))
+            rates[base_currency()] = Decimal(1)
+            _rates, _version, _loaded_at = rates, version, now
+        _checked_at = now
+        return _rates
+
+
+def reset_rates():
+    """
+    Drops this process's rates now and, once the transaction commits, every
+    other process's through the shared FX tag.
+    """
+    global _rates
+    _rates = None
+    invalidate_tags(FX_TAG)
+
+
+def rate_for(currency):
+    # Without a stored rate a currency is taken at par, as prices were compared before FX support.
+    return get_rates().get(currency, Decimal(1))
+
+
+def to_base(amount, currency):
+    if amount is None:
+        return None
+    return (Decimal(amount) * rate_for(currency)).quantize(CENTS)
+
+
+def from_base(amount, currency):
+    if amount is None:
+        return None
+    return (Decimal(amount) / rate_for(currency)).quantize(CENTS)
+
+
+def convert(amount, from_currency, to_currency):
+    if amount is None or from_currency == to_currency:
+        return amount
+    return from_base(Decimal(amount) * rate_for(from_currency), to_currency)
+
+
+def recompute_normalized_prices(currencies=None):
+    """
+    Rewrites ApartmentSearchIndex.price_base with one UPDATE per currency.
+    """
+    rates = get_rates()
+    if currencies is None:
+        currencies = ApartmentSearchIndex.objects.order_by().values_list("currency", flat=True).distinct()
+
+    updated = 0
+    for currency in set(currencies):
+        updated += ApartmentSearchIndex.objects.filter(currency=currency).update(
+            price_base=Round(F("price_per_night") * Value(rates.get(currency, Decimal(1))), 2)
+        )
+    return updated
+
+
+def set_rates(rates):
+    """
+    Stores {currency: rate} and recomputes the normalized prices of those currencies in bulk.
+    """
+    invalid = sorted(currency for currency, rate in rates.items() if rate <= 0)
+    if invalid:
+        raise ValueError(f"Exchange rates must be positive: {', '.join(invalid)}")
+    ExchangeRate.objects.bulk_create(
+        [ExchangeRate(currency=currency, rate=rate) for currency, rate in rates.items()],
+        update_conflicts=True,
+        unique_fields=["currency"],
+        update_fields=["rate", "updated_at"],
+    )
+    reset_rates()
+    return recompute_normalized_prices(rates)
@@ -0,0 +1,113 @@
+import math
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Abs, Least
+
+KM_PER_DEGREE = 111.32
+
+# Fixed 0.1 degree grid (~11km at the equator). A cell id packs row and
+# column so that one row of a bounding box is a single contiguous id range.
+GRID_DEGREES = 0.1
+GRID_COLUMNS = 3600
+MAX_GRID_ROWS = 60
+
+
+def _row(lat):
+    return min(int(math.floor((lat + 90) / GRID_DEGREES)), int(180 / GRID_DEGREES) - 1)
+
+
+def _column(lng):
+    return min(int(math.floor((lng + 180) / GRID_DEGREES)), GRID_COLUMNS - 1)
+
+
+def geo_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    return _row(float(lat)) * GRID_COLUMNS + _column(float(lng))
+
+
+def bbox_for_radius(lat, lng, radius_km):
+    """
+    (south, west, north, east) box enclosing the circle; west > east when it wraps the antimeridian.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if dlng >= 180.0:
+        return south, -180.0, north, 180.0
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def _longitude_spans(west, east):
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def bbox_q(south, west, north, east, prefix="search_index__"):
+    """
+    Q for points inside the box. Small boxes are narrowed through the grid
+    cell index (one range scan per grid row); large ones use the raw
+    coordinate ranges.
+    """
+    spans = _longitude_spans(west, east)
+
+    exact = Q(**{f"{prefix}latitude__gte": south, f"{prefix}latitude__lte": north})
+    lng_q = Q()
+    for lo, hi in spans:
+        lng_q |= Q(**{f"{prefix}longitude__gte": lo, f"{prefix}longitude__lte": hi})
+    exact &= lng_q
+
+    first_row, last_row = _row(south), _row(north)
+    if last_row - first_row + 1 > MAX_GRID_ROWS:
+        return exact
+
+    cells = Q()
+    for row in range(first_row, last_row + 1):
+        for lo, hi in spans:
+            base = row * GRID_COLUMNS
+            cells |= Q(**{f"{prefix}geo_cell__range": (base + _column(lo), base + _column(hi))})
+    return cells & exact
+
+
+def squared_distance(lat, lng, prefix="search_index__"):
+    """
+    Equirectangular squared distance in degrees^2: cheap, index-free and
+    monotonic with true distance at city scale, so it is used for ordering.
+    The longitude delta is taken the short way round, across the antimeridian
+    when that is nearer.
+    """
+    k = math.cos(math.radians(lat))
+    dlat = F(f"{prefix}latitude") - Value(lat)
+    delta = Abs(F(f"{prefix}longitude") - Value(lng))
+    dlng = Least(delta, Value(360.0) - delta) * Value(k)
+    return ExpressionWrapper(dlat * dlat + dlng * dlng, output_field=FloatField())
+
+
+def within_radius(queryset, lat, lng, radius_km, prefix="search_index__"):
+    """
+    Apartments within `radius_km` of (lat, lng), nearest first.
+    """
+    south, west, north, east = bbox_for_radius(lat, lng, radius_km)
+    max_degrees = radius_km / KM_PER_DEGREE
+    return (
+        queryset
+        .filter(bbox_q(south, west, north, east, prefix))
+        .annotate(geo_distance=squared_distance(lat, lng, prefix))
+        .filter(geo_distance__lte=max_degrees * max_degrees)
+        .order_by("geo_distance")
+    )
+
+
+def within_bbox(queryset, south, west, north, east, prefix="search_index__"):
+    queryset = queryset.filter(bbox_q(south, west, north, east, prefix))
+    center_lat = (south + north) / 2
+    center_lng = (west + east) / 2 if west <= east else ((west + east + 360) / 2 + 180) % 360 - 180
+    return queryset.annotate(geo_distance=squared_distance(center_lat, center_lng, prefix)).order_by("geo_distance")
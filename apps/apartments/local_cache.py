@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MISS = object()
+
+INVALIDATION_CHANNEL = "apartments:cache:invalidate"
+# Lists and tuples longer than this are sized from an evenly spaced sample of their items.
+SIZE_SAMPLE = 16
+
+
+def approximate_size(value):
+    """
+    Pickled size of `value`, extrapolated from a sample of items for long
+    lists and tuples so large row lists are never serialized whole just to
+    be measured.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (list, tuple)) and len(value) > SIZE_SAMPLE:
+        sample = value[::len(value) // SIZE_SAMPLE]
+        return len(pickle.dumps(sample, pickle.HIGHEST_PROTOCOL)) * len(value) // len(sample)
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class LocalTier:
+    """
+    Bounded in-process LRU in front of the shared cache.
+
+    Capacity is counted in estimated pickled bytes and every entry also has
+    a short TTL, so a missed invalidation message can only serve stale data
+    for that long. Entries remember their tags so an invalidation evicts
+    only what it touches.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            value, tags, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags, generation):
+        """
+        Stores `value` unless an invalidation ran since `generation` was read,
+        in which case the value may already be stale and is skipped.
+        """
+        try:
+            size = approximate_size(value)
+        except Exception:
+            return
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, tuple(tags), size, time.monotonic() + self.ttl)
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, tags, size, _ = entry
+        self._size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+tier = LocalTier(
+    max_bytes=getattr(settings, "CATALOG_LOCAL_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+    ttl=getattr(settings, "CATALOG_LOCAL_CACHE_TTL", 30),
+)
+
+
+def _redis_connection():
+    if not getattr(settings, "REDIS_URL", ""):
+        return None
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        return None
+
+
+_listener_pid = None
+_listener_guard = threading.Lock()
+
+
+def _listen():
+    backoff = 1
+    while True:
+        connection = _redis_connection()
+        if connection is None:
+            return
+        try:
+            pubsub = connection.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything published while we were disconnected is lost: start clean.
+            tier.clear()
+            backoff = 1
+            for message in pubsub.listen():
+                tier.invalidate(json.loads(message["data"]))
+        except Exception:
+            logger.warning("Catalog cache invalidation listener disconnected", exc_info=True)
+            tier.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+def ensure_listener():
+    """
+    Starts the pub/sub listener once per process (again after a fork, as
+    with gunicorn workers). Without Redis there is nothing to listen to:
+    LocMemCache is per-process, so local invalidation is already complete.
+    """
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_guard:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        tier.clear()
+        if _redis_connection() is not None:
+            threading.Thread(target=_listen, name="catalog-cache-invalidation", daemon=True).start()
+
+
+def enabled():
+    if not getattr(settings, "CATALOG_LOCAL_CACHE_ENABLED", True):
+        return False
+    ensure_listener()
+    return True
+
+
+def broadcast_invalidation(tags):
+    tier.invalidate(tags)
+    connection = _redis_connection()
+    if connection is None:
+        return
+    try:
+        connection.publish(INVALIDATION_CHANNEL, json.dumps(list(tags)))
+    except Exception:
+        logger.warning("Could not publish catalog cache invalidation", exc_info=True)
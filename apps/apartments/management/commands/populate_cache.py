@@ -1,11 +1,25 @@
 from django.core.management.base import BaseCommand
-from apps.apartments.utils import get_cached_active_apartments, get_cached_apartment_detail
-from apps.apartments.models import Apartment
+from apps.apartments.warmup import WARM_BATCH_SIZE, warm_catalog
 
 class Command(BaseCommand):
     help = "Populate Redis cache for apartments"
-    def handle(self, *args, **kwargs):
-        get_cached_active_apartments()
-        for apt in Apartment.objects.all():
-            get_cached_apartment_detail(apt.id)
-        self.stdout.write(self.style.SUCCESS("Apartment cache populated!"))
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=WARM_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--force", action="store_true", help="Rewrite entries even if they are up to date.")
+
+    def handle(self, *args, **options):
+        def progress(done, total, written):
+            self.stdout.write(f"{done}/{total} apartments checked, {written} entries written")
+
+        summary = warm_catalog(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            force=options["force"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Apartment cache populated! {summary['written']} written, {summary['skipped']} unchanged "
+            f"in {summary['seconds']:.2f}s"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.apartments.uploads import pending_uploads, process_spooled
+
+class Command(BaseCommand):
+    help = "Upload apartment images left in the spool (queue overflow, restarts, failures)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry uploads that ran out of retries.")
+
+    def handle(self, *args, **options):
+        paths = pending_uploads(retry_failed=options["retry_failed"])
+        uploaded = sum(1 for path in paths if process_spooled(path))
+        self.stdout.write(self.style.SUCCESS(f"Uploaded {uploaded} of {len(paths)} spooled images"))
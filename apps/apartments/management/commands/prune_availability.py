@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.apartments.availability import prune_past_availability, rebuild_ranges_from_rows
+
+class Command(BaseCommand):
+    help = "Drop past availability ranges (run daily), optionally rebuilding them from per-day rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Rebuild ranges from ApartmentAvailability rows first")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            created = rebuild_ranges_from_rows()
+            self.stdout.write(f"Rebuilt {created} availability ranges")
+        deleted = prune_past_availability()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} past availability ranges"))
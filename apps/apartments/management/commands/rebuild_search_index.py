@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from apps.apartments.fulltext import rebuild_fulltext_index
+from apps.apartments.search import refresh_search_index
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized apartment search index and the full-text index"
+
+    def handle(self, *args, **kwargs):
+        total = refresh_search_index()
+        documents = rebuild_fulltext_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} apartments, {documents} full-text documents"))
@@ -0,0 +1,26 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.apartments.fx import base_currency, recompute_normalized_prices, set_rates
+
+class Command(BaseCommand):
+    help = "Store exchange rates to the base currency and recompute normalized apartment prices"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", action="append", default=[], metavar="CUR=RATE",
+                            help="Value of one unit of CUR in the base currency, e.g. USD=0.79")
+
+    def handle(self, *args, **options):
+        rates = {}
+        for item in options["rate"]:
+            currency, _, value = item.partition("=")
+            try:
+                rate = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f"Invalid rate: {item}")
+            if not rate > 0:
+                raise CommandError(f"Rate must be positive: {item}")
+            rates[currency.strip().upper()] = rate
+
+        updated = set_rates(rates) if rates else recompute_normalized_prices()
+        self.stdout.write(self.style.SUCCESS(f"Normalized {updated} prices to {base_currency()}"))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:19
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def compact_availability_rows(apps, schema_editor):
+    ApartmentAvailability = apps.get_model('apartments', 'ApartmentAvailability')
+    ApartmentAvailabilityRange = apps.get_model('apartments', 'ApartmentAvailabilityRange')
+
+    rows = (
+        ApartmentAvailability.objects
+        .filter(date__gte=timezone.localdate())
+        .order_by('apartment_id', 'date')
+        .values_list('apartment_id', 'date', 'is_available')
+    )
+
+    ranges = []
+    for apartment_id, day, is_available in rows.iterator():
+        last = ranges[-1] if ranges else None
+        if last and last.apartment_id == apartment_id and last.end_date == day and last.is_available == is_available:
+            last.end_date = day + timedelta(days=1)
+            continue
+        ranges.append(ApartmentAvailabilityRange(
+            apartment_id=apartment_id,
+            start_date=day,
+            end_date=day + timedelta(days=1),
+            is_available=is_available,
+        ))
+
+    ApartmentAvailabilityRange.objects.bulk_create(ranges, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0009_alter_apartment_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApartmentAvailabilityRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('is_available', models.BooleanField(default=True)),
+                ('apartment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_ranges', to='apartments.apartment')),
+            ],
+            options={
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['apartment', 'start_date'], name='apt_avail_range_start_idx'), models.Index(fields=['end_date'], name='apt_avail_range_end_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='apt_avail_range_non_empty')],
+            },
+        ),
+        migrations.RunPython(compact_availability_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_search_index(apps, schema_editor):
+    Apartment = apps.get_model('apartments', 'Apartment')
+    ApartmentSearchIndex = apps.get_model('apartments', 'ApartmentSearchIndex')
+
+    entries = []
+    for apartment in Apartment.objects.select_related('pricing', 'address').iterator():
+        pricing = getattr(apartment, 'pricing', None)
+        address = getattr(apartment, 'address', None)
+        entries.append(ApartmentSearchIndex(
+            apartment_id=apartment.id,
+            is_active=apartment.is_active,
+            is_verified=apartment.is_verified,
+            property_type=apartment.property_type,
+            total_bedrooms=apartment.total_bedrooms,
+            max_guests=apartment.max_guests,
+            city=address.city.strip().lower() if address else '',
+            country=address.country.strip().lower() if address else '',
+            price_per_night=pricing.price_per_night if pricing else None,
+            currency=pricing.currency if pricing else '',
+            created_at=apartment.created_at,
+        ))
+    ApartmentSearchIndex.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0010_apartmentavailabilityrange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApartmentSearchIndex',
+            fields=[
+                ('apartment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='apartments.apartment')),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('property_type', models.CharField(max_length=50)),
+                ('total_bedrooms', models.PositiveIntegerField(default=1)),
+                ('max_guests', models.PositiveIntegerField(default=1)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('price_per_night', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('currency', models.CharField(blank=True, max_length=10)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_active', 'is_verified', 'city', 'price_per_night'], name='apt_search_city_price_idx'), models.Index(fields=['is_active', 'is_verified', 'country', 'price_per_night'], name='apt_search_country_price_idx'), models.Index(fields=['is_active', 'is_verified', 'price_per_night'], name='apt_search_price_idx'), models.Index(fields=['is_active', 'is_verified', 'property_type', 'max_guests'], name='apt_search_type_guests_idx'), models.Index(fields=['is_active', 'is_verified', 'max_guests', 'total_bedrooms'], name='apt_search_guests_beds_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Kept inline rather than imported from apps.apartments.fulltext so this
+# migration keeps working however that module changes later.
+FTS_TABLE = 'apartments_apartment_fts'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, description, city, state, country, street, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, city, state, country, street) "
+            "SELECT a.id, coalesce(a.title, ''), coalesce(a.description, ''), coalesce(ad.city, ''), "
+            "coalesce(ad.state, ''), coalesce(ad.country, ''), coalesce(ad.street, '') "
+            "FROM apartments_apartment a "
+            "LEFT JOIN apartments_apartmentaddress ad ON ad.apartment_id = a.id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            "apartment_id bigint PRIMARY KEY REFERENCES apartments_apartment (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_idx ON {FTS_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE} (apartment_id, document)
+            SELECT a.id,
+                   setweight(to_tsvector('english', coalesce(a.title, '')), 'A')
+                || setweight(to_tsvector('simple', concat_ws(' ', ad.city, ad.state, ad.country)), 'B')
+                || setweight(to_tsvector('english', coalesce(a.description, '')), 'C')
+                || setweight(to_tsvector('simple', coalesce(ad.street, '')), 'D')
+            FROM apartments_apartment a
+            LEFT JOIN apartments_apartmentaddress ad ON ad.apartment_id = a.id
+            ON CONFLICT (apartment_id) DO UPDATE SET document = EXCLUDED.document
+            """
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0011_apartmentsearchindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0012_apartment_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apartmentaddress',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='apartmentaddress',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='apartmentsearchindex',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='apartmentsearchindex',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='apartmentsearchindex',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='apartmentsearchindex',
+            index=models.Index(fields=['is_active', 'is_verified', 'geo_cell'], name='apt_search_geo_cell_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apartmentsearchindex',
+            index=models.Index(fields=['is_active', 'is_verified', 'latitude'], name='apt_search_latitude_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0013_apartment_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apartment',
+            index=models.Index(fields=['is_active', 'created_at', 'id'], name='apt_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+AMENITY_MASK_BITS = 63
+
+
+def backfill_amenity_masks(apps, schema_editor):
+    Amenity = apps.get_model('apartments', 'Amenity')
+    Apartment = apps.get_model('apartments', 'Apartment')
+    ApartmentSearchIndex = apps.get_model('apartments', 'ApartmentSearchIndex')
+
+    for bit, amenity in enumerate(Amenity.objects.order_by('id')[:AMENITY_MASK_BITS]):
+        amenity.bit = bit
+        amenity.save(update_fields=['bit'])
+
+    masks = {}
+    for apartment_id, bit in (
+        Apartment.amenities.through.objects
+        .filter(amenity__bit__isnull=False)
+        .values_list('apartment_id', 'amenity__bit')
+    ):
+        masks[apartment_id] = masks.get(apartment_id, 0) | (1 << bit)
+
+    entries = list(ApartmentSearchIndex.objects.filter(apartment_id__in=masks))
+    for entry in entries:
+        entry.amenity_mask = masks[entry.apartment_id]
+    ApartmentSearchIndex.objects.bulk_update(entries, ['amenity_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0014_apartment_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='apartmentsearchindex',
+            name='amenity_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_amenity_masks, migrations.RunPython.noop),
+    ]
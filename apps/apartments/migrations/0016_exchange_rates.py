@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+def backfill_price_base(apps, schema_editor):
+    # No rates are stored yet, so every currency is at par until rates are set.
+    ApartmentSearchIndex = apps.get_model('apartments', 'ApartmentSearchIndex')
+    ApartmentSearchIndex.objects.update(price_base=models.F('price_per_night'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0015_amenity_bitmask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('GBP', 'British Pound'), ('USD', 'US Dollar'), ('EUR', 'Euro')], max_length=10, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='apartmentsearchindex',
+            name='apt_search_city_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='apartmentsearchindex',
+            name='apt_search_country_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='apartmentsearchindex',
+            name='apt_search_price_idx',
+        ),
+        migrations.AddField(
+            model_name='apartmentsearchindex',
+            name='price_base',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='apartmentsearchindex',
+            index=models.Index(fields=['is_active', 'is_verified', 'city', 'price_base'], name='apt_search_city_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apartmentsearchindex',
+            index=models.Index(fields=['is_active', 'is_verified', 'country', 'price_base'], name='apt_search_country_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apartmentsearchindex',
+            index=models.Index(fields=['is_active', 'is_verified', 'price_base'], name='apt_search_base_price_idx'),
+        ),
+        migrations.RunPython(backfill_price_base, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0016_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apartment',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('processing', 'Processing'), ('failed', 'Failed')], default='ready', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0017_apartment_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apartment',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:06
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def delete_non_positive_rates(apps, schema_editor):
+    # Currencies without a stored rate are taken at par, which is what a zero rate was meant to mean.
+    ExchangeRate = apps.get_model('apartments', 'ExchangeRate')
+    ExchangeRate.objects.filter(rate__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0018_apartment_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exchangerate',
+            name='rate',
+            field=models.DecimalField(decimal_places=8, max_digits=18, validators=[django.core.validators.MinValueValidator(Decimal('1E-8'), message='Rate must be positive.')]),
+        ),
+        migrations.RunPython(delete_non_positive_rates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.CheckConstraint(condition=models.Q(('rate__gt', 0)), name='exchange_rate_positive'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Kept inline rather than imported from apps.apartments.uploads so this
+# migration keeps working however that module changes later.
+IMAGE_VARIANTS = {
+    'thumb': (160, 120),
+    'card': (480, 320),
+    'hero': (1600, 900),
+}
+BATCH_SIZE = 500
+
+
+def variants_for(image):
+    # Images uploaded before image_variants was recorded get Cloudinary
+    # transformation URLs for each size.
+    variants = {'original': {'url': image.build_url(secure=True), 'width': None, 'height': None}}
+    for name, (width, height) in IMAGE_VARIANTS.items():
+        variants[name] = {
+            'url': image.build_url(secure=True, width=width, height=height, crop='fill'),
+            'width': width,
+            'height': height,
+        }
+    return variants
+
+
+def backfill_image_variants(apps, schema_editor):
+    Apartment = apps.get_model('apartments', 'Apartment')
+    pending = []
+    for apartment in Apartment.objects.exclude(image__isnull=True).exclude(image='').only('id', 'image', 'image_variants').iterator():
+        if apartment.image_variants or not apartment.image:
+            continue
+        apartment.image_variants = variants_for(apartment.image)
+        pending.append(apartment)
+        if len(pending) >= BATCH_SIZE:
+            Apartment.objects.bulk_update(pending, ['image_variants'])
+            pending = []
+    Apartment.objects.bulk_update(pending, ['image_variants'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0019_exchange_rate_positive'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_image_variants, migrations.RunPython.noop),
+    ]
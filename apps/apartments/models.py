@@ -1,9 +1,14 @@
-from django.db import models
+import logging
+from decimal import Decimal
+
+from django.core.validators import MinValueValidator
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from cloudinary.models import CloudinaryField
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 CURRENCY = (
     ("GBP", "British Pound"),
@@ -12,9 +17,55 @@ CURRENCY = (
 )
 
 
+IMAGE_READY = "ready"
+IMAGE_PROCESSING = "processing"
+IMAGE_FAILED = "failed"
+IMAGE_STATUS_CHOICES = (
+    (IMAGE_READY, "Ready"),
+    (IMAGE_PROCESSING, "Processing"),
+    (IMAGE_FAILED, "Failed"),
+)
+
+# Amenities get one bit each in ApartmentSearchIndex.amenity_mask (a signed BIGINT).
+AMENITY_MASK_BITS = 63
+AMENITY_BIT_ATTEMPTS = 5
+
+
 class Amenity(models.Model):
     name = models.CharField(max_length=100, unique=True)
     icon = models.CharField(max_length=100, blank=True)
+    bit = models.PositiveSmallIntegerField(null=True, blank=True, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+
+        # Concurrent saves can pick the same free bit; the unique constraint
+        # rejects all but one, and the others retry with the next free bit.
+        for _ in range(AMENITY_BIT_ATTEMPTS):
+            self.bit = self._free_bit()
+            if self.bit is None:
+                break
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not Amenity.objects.filter(bit=self.bit).exclude(pk=self.pk).exists():
+                    self.bit = None
+                    raise
+        else:
+            self.bit = None
+
+        logger.warning(
+            "Could not claim one of the %s amenity mask bits for %r; search falls back to a join for it.",
+            AMENITY_MASK_BITS, self.name,
+        )
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def _free_bit():
+        taken = set(Amenity.objects.exclude(bit=None).values_list("bit", flat=True))
+        return next((bit for bit in range(AMENITY_MASK_BITS) if bit not in taken), None)
 
     def __str__(self):
         return self.name
@@ -33,6 +84,9 @@ class Apartment(models.Model):
         blank=True,
 
     )
+    image_status = models.CharField(max_length=20, choices=IMAGE_STATUS_CHOICES, default=IMAGE_READY)
+    # Resized copies of image made at upload time; see uploads.IMAGE_VARIANTS.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_cover = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -60,6 +114,11 @@ class Apartment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'created_at', 'id'], name='apt_active_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -76,12 +135,31 @@ class ApartmentPricing(models.Model):
         return f"Pricing for {self.apartment.title}"
 
 
+class ExchangeRate(models.Model):
+    """
+    Value of one unit of `currency` in settings.BASE_CURRENCY.
+    """
+    currency = models.CharField(max_length=10, unique=True, choices=CURRENCY)
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(Decimal("0.00000001"), message="Rate must be positive.")])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(rate__gt=0), name='exchange_rate_positive'),
+        ]
+
+    def __str__(self):
+        return f"{self.currency} = {self.rate}"
+
+
 class ApartmentAddress(models.Model):
     apartment = models.OneToOneField(Apartment, on_delete=models.CASCADE, related_name='address')
     country = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
     city = models.CharField(max_length=100)
     street = models.CharField(max_length=255)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 
     def __str__(self):
         return f"Address for {self.apartment.title}"
@@ -100,6 +178,70 @@ class ApartmentAvailability(models.Model):
         return f"{self.apartment.title} - {self.date}"
 
 
+class ApartmentAvailabilityRange(models.Model):
+    """
+    Run-length availability: one row per [start_date, end_date) run of nights
+    sharing the same status. Written through apps.apartments.availability.
+    """
+    apartment = models.ForeignKey(Apartment, on_delete=models.CASCADE, related_name='availability_ranges')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    is_available = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['apartment', 'start_date'], name='apt_avail_range_start_idx'),
+            models.Index(fields=['end_date'], name='apt_avail_range_end_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gt=models.F('start_date')),
+                name='apt_avail_range_non_empty',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.apartment.title} - {self.start_date} to {self.end_date}"
+
+
+class ApartmentSearchIndex(models.Model):
+    """
+    Denormalized, join-free copy of the searchable listing attributes.
+    Maintained by apps.apartments.search; never edit by hand.
+    """
+    apartment = models.OneToOneField(Apartment, on_delete=models.CASCADE, primary_key=True, related_name='search_index')
+    is_active = models.BooleanField(default=True)
+    is_verified = models.BooleanField(default=False)
+    property_type = models.CharField(max_length=50)
+    total_bedrooms = models.PositiveIntegerField(default=1)
+    max_guests = models.PositiveIntegerField(default=1)
+    city = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=10, blank=True)
+    price_base = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.BigIntegerField(null=True, blank=True)
+    amenity_mask = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'is_verified', 'city', 'price_base'], name='apt_search_city_base_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'country', 'price_base'], name='apt_search_country_base_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'price_base'], name='apt_search_base_price_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'property_type', 'max_guests'], name='apt_search_type_guests_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'max_guests', 'total_bedrooms'], name='apt_search_guests_beds_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'geo_cell'], name='apt_search_geo_cell_idx'),
+            models.Index(fields=['is_active', 'is_verified', 'latitude'], name='apt_search_latitude_idx'),
+        ]
+
+    def __str__(self):
+        return f"Search index for {self.apartment_id}"
+
+
 class ApartmentRule(models.Model):
     apartment = models.ForeignKey(Apartment, on_delete=models.CASCADE, related_name='rules')
     rule_text = models.CharField(max_length=255)
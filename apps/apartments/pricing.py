@@ -0,0 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from .models import ApartmentPricing
+
+CENTS = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+# Nights starting on Friday or Saturday are charged at weekend_price when one is set.
+WEEKEND_NIGHTS = frozenset((4, 5))
+
+
+def is_weekend_night(night):
+    return night.weekday() in WEEKEND_NIGHTS
+
+
+def count_weekend_nights(check_in, check_out):
+    """
+    Weekend nights in [check_in, check_out), in O(1) rather than per night.
+    """
+    nights = (check_out - check_in).days
+    full_weeks, remainder = divmod(max(nights, 0), 7)
+    start = check_in.weekday()
+    return full_weeks * len(WEEKEND_NIGHTS) + sum(
+        1 for offset in range(remainder) if (start + offset) % 7 in WEEKEND_NIGHTS
+    )
+
+
+def _rates(pricing):
+    price = Decimal(pricing.price_per_night)
+    weekend = Decimal(pricing.weekend_price) if pricing.weekend_price is not None else price
+    return price, weekend
+
+
+def quote(pricing, check_in, check_out, nights=None, weekend_nights=None):
+    """
+    Price of a stay in [check_in, check_out): nightly rates (weekend_price
+    on weekend nights) plus cleaning and service fees. `pricing` is an
+    ApartmentPricing or anything with the same attributes; pass precomputed
+    `nights`/`weekend_nights` when quoting one stay for many apartments.
+    """
+    if nights is None:
+        nights = (check_out - check_in).days
+    if weekend_nights is None:
+        weekend_nights = count_weekend_nights(check_in, check_out)
+
+    price, weekend = _rates(pricing)
+    subtotal = price * (nights - weekend_nights) + weekend * weekend_nights
+    cleaning_fee = Decimal(pricing.cleaning_fee or 0)
+    service_fee = Decimal(pricing.service_fee or 0)
+    return {
+        "currency": pricing.currency,
+        "nights": nights,
+        "weekend_nights": weekend_nights,
+        "subtotal": subtotal.quantize(CENTS),
+        "cleaning_fee": cleaning_fee.quantize(CENTS),
+        "service_fee": service_fee.quantize(CENTS),
+        "total": (subtotal + cleaning_fee + service_fee).quantize(CENTS),
+    }
+
+
+def nightly_breakdown(pricing, check_in, check_out):
+    """
+    [(night, rate)] for every night of the stay.
+    """
+    price, weekend = _rates(pricing)
+    breakdown = []
+    night = check_in
+    while night < check_out:
+        breakdown.append((night, (weekend if is_weekend_night(night) else price).quantize(CENTS)))
+        night += timedelta(days=1)
+    return breakdown
+
+
+def stay_total(apartment, check_in, check_out):
+    """
+    Total for a booking of `apartment`; 0.00 when it has no pricing.
+    """
+    try:
+        pricing = apartment.pricing
+    except ApartmentPricing.DoesNotExist:
+        return ZERO
+    return quote(pricing, check_in, check_out)["total"]
+
+
+def quote_apartments(apartment_ids, check_in, check_out, breakdown=False):
+    """
+    Quotes one stay for many active apartments: a single query for their
+    pricing, with the night counts shared by all of them. Apartments that
+    are inactive or have no pricing are left out. With `breakdown`, each
+    quote also lists its nightly rates.
+    """
+    nights = (check_out - check_in).days
+    weekend_nights = count_weekend_nights(check_in, check_out)
+    pricings = ApartmentPricing.objects.filter(apartment_id__in=apartment_ids, apartment__is_active=True).only(
+        "apartment_id", "price_per_night", "weekend_price", "cleaning_fee", "service_fee", "currency",
+    )
+
+    quotes = {}
+    for pricing in pricings:
+        stay = quote(pricing, check_in, check_out, nights, weekend_nights)
+        if breakdown:
+            stay["nightly"] = [
+                {"date": night, "price": price} for night, price in nightly_breakdown(pricing, check_in, check_out)
+            ]
+        quotes[pricing.apartment_id] = stay
+    return quotes
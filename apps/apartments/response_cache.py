@@ -0,0 +1,78 @@
+import gzip
+
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .cache import MISS, get_tagged, set_many_tagged
+
+try:
+    import brotli
+except ImportError:  # optional; gzip/identity variants are always available
+    brotli = None
+
+RESPONSE_CACHE_VERSION = 5
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+ENCODINGS = ("br", "gzip", "identity") if brotli else ("gzip", "identity")
+
+LIST_RESPONSE_KEY = "apartments:response:list"
+DETAIL_RESPONSE_KEY = "apartments:response:detail:{id}"
+
+
+def _variant_key(key, encoding):
+    return f"{key}:v{RESPONSE_CACHE_VERSION}:{encoding}"
+
+
+def negotiate_encoding(request):
+    """
+    Best encoding we store that the client accepts (q=0 excludes it).
+    """
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+
+    for encoding in ENCODINGS:
+        if encoding in accepted or (encoding != "identity" and "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def encode_variants(body):
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=6, mtime=0)}
+    if brotli:
+        variants["br"] = brotli.compress(body, quality=5)
+    return variants
+
+
+def _response(body, encoding):
+    response = HttpResponse(body, content_type="application/json")
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def cached_json_response(request, key, tags, build, timeout=RESPONSE_CACHE_TIMEOUT):
+    """
+    Serves the pre-rendered, pre-compressed body stored under `key`.
+
+    A hit is one cache round trip (the negotiated variant plus its tag
+    versions in one get_many) and no ORM or serializer work. On a miss
+    `build()` returns the data to render (or None for a 404, which is not
+    cached) and every variant is written in one set_many.
+    """
+    encoding = negotiate_encoding(request)
+    body, versions = get_tagged(_variant_key(key, encoding), tags)
+    if body is not MISS:
+        return _response(body, encoding)
+
+    data = build()
+    if data is None:
+        return None
+
+    variants = encode_variants(JSONRenderer().render(data))
+    set_many_tagged({_variant_key(key, name): value for name, value in variants.items()}, versions, timeout)
+    return _response(variants[encoding], encoding)
@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+from django.db.models import Count, F
+
+from .fx import to_base
+from .geo import geo_cell
+from .models import Amenity, Apartment, ApartmentSearchIndex
+
+SEARCH_INDEX_FIELDS = [
+    "is_active",
+    "is_verified",
+    "property_type",
+    "total_bedrooms",
+    "max_guests",
+    "city",
+    "country",
+    "price_per_night",
+    "currency",
+    "price_base",
+    "latitude",
+    "longitude",
+    "geo_cell",
+    "amenity_mask",
+    "created_at",
+]
+
+
+def normalize_term(value):
+    return (value or "").strip().lower()
+
+
+def amenity_masks(apartment_ids):
+    """
+    {apartment_id: bitmask of its amenities' bits}, from one query on the through table.
+    """
+    masks = defaultdict(int)
+    for apartment_id, bit in (
+        Apartment.amenities.through.objects
+        .filter(apartment_id__in=apartment_ids, amenity__bit__isnull=False)
+        .values_list("apartment_id", "amenity__bit")
+    ):
+        masks[apartment_id] |= 1 << bit
+    return masks
+
+
+def build_search_entry(apartment, amenity_mask=0):
+    """
+    Flattens an apartment (with pricing/address loaded) into its search row.
+    """
+    pricing = getattr(apartment, "pricing", None)
+    address = getattr(apartment, "address", None)
+    latitude = address.latitude if address else None
+    longitude = address.longitude if address else None
+    if latitude is None or longitude is None:
+        latitude = longitude = None
+
+    return ApartmentSearchIndex(
+        apartment_id=apartment.id,
+        is_active=apartment.is_active,
+        is_verified=apartment.is_verified,
+        property_type=apartment.property_type,
+        total_bedrooms=apartment.total_bedrooms,
+        max_guests=apartment.max_guests,
+        city=normalize_term(address.city) if address else "",
+        country=normalize_term(address.country) if address else "",
+        price_per_night=pricing.price_per_night if pricing else None,
+        currency=pricing.currency if pricing else "",
+        price_base=to_base(pricing.price_per_night, pricing.currency) if pricing else None,
+        latitude=float(latitude) if latitude is not None else None,
+        longitude=float(longitude) if longitude is not None else None,
+        geo_cell=geo_cell(latitude, longitude),
+        amenity_mask=amenity_mask,
+        created_at=apartment.created_at,
+    )
+
+
+def refresh_search_index(apartment_ids=None, batch_size=1000):
+    """
+    Upserts search rows for the given apartments (all when None) in batches.
+    """
+    queryset = Apartment.objects.select_related("pricing", "address").order_by("id")
+    if apartment_ids is not None:
+        queryset = queryset.filter(id__in=apartment_ids)
+
+    total = 0
+    batch = []
+    for apartment in queryset.iterator(chunk_size=batch_size):
+        batch.append(apartment)
+        if len(batch) >= batch_size:
+            total += _upsert(batch)
+            batch = []
+    if batch:
+        total += _upsert(batch)
+    return total
+
+
+def _upsert(apartments):
+    masks = amenity_masks([apartment.id for apartment in apartments])
+    entries = [build_search_entry(apartment, masks.get(apartment.id, 0)) for apartment in apartments]
+    ApartmentSearchIndex.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["apartment"],
+        update_fields=SEARCH_INDEX_FIELDS,
+    )
+    return len(entries)
+
+
+def apartments_with_all_amenities(amenity_ids):
+    """
+    Apartment ids having every amenity in `amenity_ids`.
+    """
+    amenity_ids = set(amenity_ids)
+    return (
+        Apartment.amenities.through.objects
+        .filter(amenity_id__in=amenity_ids)
+        .values("apartment_id")
+        .annotate(matched=Count("amenity_id"))
+        .filter(matched=len(amenity_ids))
+        .values("apartment_id")
+    )
+
+
+def clear_amenity_bit(amenity):
+    """
+    Drops `amenity` from every mask, e.g. before it is deleted and its bit reused.
+    """
+    if amenity.bit is not None:
+        ApartmentSearchIndex.objects.filter(amenity_mask__gt=0).update(
+            amenity_mask=F("amenity_mask").bitand(~(1 << amenity.bit))
+        )
+
+
+def filter_all_amenities(queryset, amenity_ids):
+    """
+    Narrows `queryset` to apartments having every amenity in `amenity_ids`:
+    a bitwise test on the search row, with the through-table GROUP BY only
+    for amenities that have no bit (more than AMENITY_MASK_BITS exist).
+    """
+    amenity_ids = set(amenity_ids)
+    bits = dict(Amenity.objects.filter(id__in=amenity_ids).values_list("id", "bit"))
+    if len(bits) < len(amenity_ids):
+        return queryset.none()
+
+    mask = 0
+    for bit in bits.values():
+        if bit is not None:
+            mask |= 1 << bit
+    if mask:
+        queryset = queryset.alias(amenity_hits=F("search_index__amenity_mask").bitand(mask)).filter(amenity_hits=mask)
+
+    unmapped = [amenity_id for amenity_id, bit in bits.items() if bit is None]
+    if unmapped:
+        queryset = queryset.filter(id__in=apartments_with_all_amenities(unmapped))
+    return queryset
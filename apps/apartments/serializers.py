@@ -1,6 +1,14 @@
+from datetime import date, timedelta
+
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 
+from apps.base.sparse_fields import SparseFieldsSerializerMixin
+
+from .availability import expand_ranges
+from .fx import convert
 from .models import (
     Apartment,
     Amenity,
@@ -10,6 +18,18 @@ from .models import (
     ApartmentRule
 )
 
+MAX_SPAN_DAYS = 730
+DEFAULT_AVAILABILITY_DAYS = 90
+MAX_AVAILABILITY_DAYS = 366
+# Availability dates outside this range are rejected, which also keeps date
+# arithmetic on them well clear of date.min/date.max.
+MIN_AVAILABILITY_DATE = date(2000, 1, 1)
+MAX_AVAILABILITY_DATE = date(2100, 1, 1)
+AVAILABILITY_DATE_VALIDATORS = [MinValueValidator(MIN_AVAILABILITY_DATE), MaxValueValidator(MAX_AVAILABILITY_DATE)]
+MAX_SPANS = 100
+MAX_QUOTE_APARTMENTS = 100
+MAX_QUOTE_NIGHTS = 365
+
 
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,10 +54,19 @@ class ApartmentPricingSerializer(serializers.ModelSerializer):
             'currency'
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        display_currency = self.context.get("display_currency")
+        if display_currency:
+            price = convert(instance.price_per_night, instance.currency, display_currency)
+            data["display_currency"] = display_currency
+            data["display_price_per_night"] = self.fields["price_per_night"].to_representation(price)
+        return data
+
 class ApartmentAddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ApartmentAddress
-        fields = ['country', 'state', 'city', 'street']
+        fields = ['country', 'state', 'city', 'street', 'latitude', 'longitude']
 
 
 class ApartmentAvailabilitySerializer(serializers.ModelSerializer):
@@ -45,12 +74,116 @@ class ApartmentAvailabilitySerializer(serializers.ModelSerializer):
         model = ApartmentAvailability
         fields = ['date', 'is_available']
 
-class ApartmentSerializer(serializers.ModelSerializer):
+class AvailabilityRangeSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Exclusive: the first night after the run.")
+    is_available = serializers.BooleanField()
+
+
+class ApartmentAvailabilityWindowSerializer(serializers.Serializer):
+    apartment = serializers.IntegerField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    ranges = AvailabilityRangeSerializer(many=True)
+
+
+class AvailabilityWindowQuerySerializer(serializers.Serializer):
+    """
+    `from`/`to` query parameters of the availability endpoint, validated into
+    `start` and `end`.
+    """
+
+    def get_fields(self):
+        # "from" is a Python keyword, so the fields can't be class attributes.
+        return {
+            "from": serializers.DateField(required=False, validators=AVAILABILITY_DATE_VALIDATORS),
+            "to": serializers.DateField(required=False, validators=AVAILABILITY_DATE_VALIDATORS),
+        }
+
+    def validate(self, attrs):
+        start = attrs.get("from") or timezone.localdate()
+        end = attrs.get("to") or start + timedelta(days=DEFAULT_AVAILABILITY_DAYS)
+        if end <= start:
+            raise serializers.ValidationError({"to": "Must be after `from`."})
+        if (end - start).days > MAX_AVAILABILITY_DAYS:
+            raise serializers.ValidationError({"to": f"The window is limited to {MAX_AVAILABILITY_DAYS} days."})
+        return {"start": start, "end": end}
+
+
+class AvailabilitySpanSerializer(serializers.Serializer):
+    start = serializers.DateField(validators=AVAILABILITY_DATE_VALIDATORS)
+    end = serializers.DateField(
+        help_text="Exclusive: the first night not covered.", validators=AVAILABILITY_DATE_VALIDATORS,
+    )
+    is_available = serializers.BooleanField()
+
+    def validate(self, attrs):
+        if attrs["end"] <= attrs["start"]:
+            raise serializers.ValidationError({"end": "Must be after start."})
+        if (attrs["end"] - attrs["start"]).days > MAX_SPAN_DAYS:
+            raise serializers.ValidationError({"end": f"A span is limited to {MAX_SPAN_DAYS} nights."})
+        return attrs
+
+
+class AvailabilityUpsertSerializer(serializers.Serializer):
+    ranges = AvailabilitySpanSerializer(many=True, allow_empty=False, max_length=MAX_SPANS)
+
+
+class StayQuoteRequestSerializer(serializers.Serializer):
+    ids = serializers.CharField(help_text="Comma-separated apartment ids.")
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    breakdown = serializers.BooleanField(default=False, help_text="Include the rate of every night.")
+
+    def validate_ids(self, value):
+        try:
+            ids = list(dict.fromkeys(int(v) for v in value.split(",") if v.strip()))
+        except ValueError:
+            raise serializers.ValidationError("Use comma-separated integers.")
+        if not ids:
+            raise serializers.ValidationError("At least one id is required.")
+        if len(ids) > MAX_QUOTE_APARTMENTS:
+            raise serializers.ValidationError(f"At most {MAX_QUOTE_APARTMENTS} apartments per request.")
+        return ids
+
+    def validate(self, attrs):
+        nights = (attrs["check_out"] - attrs["check_in"]).days
+        if nights <= 0:
+            raise serializers.ValidationError({"check_out": "Must be after check_in."})
+        if nights > MAX_QUOTE_NIGHTS:
+            raise serializers.ValidationError({"check_out": f"Stays are limited to {MAX_QUOTE_NIGHTS} nights."})
+        return attrs
+
+
+class NightlyRateSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class StayQuoteSerializer(serializers.Serializer):
+    apartment = serializers.IntegerField()
+    currency = serializers.CharField()
+    nights = serializers.IntegerField()
+    weekend_nights = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    cleaning_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    service_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    nightly = NightlyRateSerializer(many=True, required=False)
+
+
+class ApartmentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     pricing = ApartmentPricingSerializer(read_only=True)
     address = ApartmentAddressSerializer(read_only=True)
     apartment_amenities = serializers.SerializerMethodField()
     rules = ApartmentRuleSerializer(many=True, read_only=True)
-    availability = ApartmentAvailabilitySerializer(many=True, read_only=True)
+    availability_ranges = serializers.SerializerMethodField()
+    availability = serializers.SerializerMethodField(
+        help_text="One entry per night; only rendered when requested with ?expand=availability or ?fields=.",
+    )
+
+    # Per-night availability grows with the calendar; availability_ranges carries the same data compactly.
+    opt_in_fields = ('availability',)
 
     class Meta:
         model = Apartment
@@ -69,18 +202,34 @@ class ApartmentSerializer(serializers.ModelSerializer):
             'updated_at',
             'apartment_amenities',
             'rules',
+            'availability_ranges',
             'availability',
             'image',
+            'image_status',
+            'image_variants',
             'is_cover',
             'uploaded_at',
             'pricing',
             'address',
         ]
+        read_only_fields = ['image_status', 'image_variants']
 
     @extend_schema_field(AmenitySerializer(many=True))
     def get_apartment_amenities(self, obj):
         return AmenitySerializer(obj.amenities.all(), many=True).data
 
+    @extend_schema_field(AvailabilityRangeSerializer(many=True))
+    def get_availability_ranges(self, obj):
+        return [
+            {"start": r.start_date.isoformat(), "end": r.end_date.isoformat(), "is_available": r.is_available}
+            for r in obj.availability_ranges.all()
+        ]
+
+    @extend_schema_field(ApartmentAvailabilitySerializer(many=True))
+    def get_availability(self, obj):
+        ranges = [(r.start_date, r.end_date, r.is_available) for r in obj.availability_ranges.all()]
+        return expand_ranges(ranges)
+
     def validate_image(self, value):
         if hasattr(value, 'content_type') and not value.content_type.startswith('image/'):
             raise serializers.ValidationError("Only image files are allowed.")
@@ -1,57 +1,35 @@
-from django.core.cache import cache
-from .models import Apartment, Amenity, ApartmentAvailability
-
-CACHE_TTL = 60 * 10  
-
-
-def get_apartment_list():
-    key = "apartment:list"
-
-    apartments = cache.get(key)
-    if apartments is None:
-        apartments = list(
-            Apartment.objects
-            .filter(is_active=True, is_verified=True)
-            .select_related("pricing", "address")
-            .prefetch_related("amenities", "rules")
-        )
-        cache.set(key, apartments, CACHE_TTL)
-
-    return apartments
-
-
-def get_apartment_detail(apartment_id):
-    key = f"apartment:detail:{apartment_id}"
-
-    apartment = cache.get(key)
-    if apartment is None:
-        apartment = (
-            Apartment.objects
-            .select_related("pricing", "address")
-            .prefetch_related("amenities", "rules", "availability")
-            .get(id=apartment_id)
-        )
-        cache.set(key, apartment, CACHE_TTL)
-
-    return apartment
-
-
-
-from django.core.cache import cache
-from .models import ApartmentAvailability
-
-
-def get_apartment_availability(apartment_id):
-    key = f"apartment:availability:{apartment_id}"
-
-    data = cache.get(key)
-    if data is None:
-        data = list(
-            ApartmentAvailability.objects.filter(
-                apartment_id=apartment_id,
-                is_available=True
-            )
-        )
-        cache.set(key, data, 300)  
-
-    return data
+from datetime import date
+
+from .availability import clip_ranges, get_availability_ranges, merge_ranges, month_windows
+from .cache import AVAILABILITY_TAG, apartment_tag, read_through
+
+AVAILABILITY_CACHE_TTL = 60 * 5
+
+
+def _cached_ranges(key, apartment_id, start=None, end=None):
+    rows = read_through(
+        key,
+        (apartment_tag(apartment_id), AVAILABILITY_TAG),
+        lambda: [
+            (r_start.toordinal(), r_end.toordinal(), is_available)
+            for r_start, r_end, is_available in get_availability_ranges(apartment_id, start, end)
+        ],
+        AVAILABILITY_CACHE_TTL,
+    )
+    return [(date.fromordinal(r_start), date.fromordinal(r_end), is_available) for r_start, r_end, is_available in rows]
+
+
+def get_apartment_availability(apartment_id, start=None, end=None):
+    """
+    Stored (start, end, is_available) runs for one apartment, clipped to
+    [start, end) when both are given. Windows are cached per calendar
+    month, so overlapping requests share entries.
+    """
+    if start is None or end is None:
+        return _cached_ranges(f"apartment:availability:{apartment_id}", apartment_id)
+
+    ranges = []
+    for month_start, month_end in month_windows(start, end):
+        key = f"apartment:availability:{apartment_id}:{month_start:%Y-%m}"
+        ranges.extend(_cached_ranges(key, apartment_id, month_start, month_end))
+    return clip_ranges(merge_ranges(ranges), start, end)
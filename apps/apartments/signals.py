@@ -1,16 +1,120 @@
-from django.db.models.signals import post_save, post_delete
+from datetime import timedelta
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.cache import cache
 
-from .models import Apartment, ApartmentAvailability
+from .availability import set_availability, clear_availability
+from .cache import AMENITIES_TAG, invalidate_apartments, invalidate_tags
+from .fulltext import index_documents, remove_documents
+from .fx import recompute_normalized_prices, reset_rates
+from .models import (
+    Amenity,
+    Apartment,
+    ApartmentAddress,
+    ApartmentAvailability,
+    ApartmentPricing,
+    ApartmentRule,
+    ExchangeRate,
+)
+from .search import clear_amenity_bit, refresh_search_index
 
 
 @receiver([post_save, post_delete], sender=Apartment)
+@receiver([post_save, post_delete], sender=ApartmentPricing)
+@receiver([post_save, post_delete], sender=ApartmentAddress)
+@receiver([post_save, post_delete], sender=ApartmentRule)
 def clear_apartment_cache(sender, instance, **kwargs):
-    cache.delete("apartment:list")
-    cache.delete(f"apartment:detail:{instance.id}")
+    apartment_id = instance.id if sender is Apartment else instance.apartment_id
+    invalidate_apartments(apartment_id)
+
+
+@receiver(m2m_changed, sender=Apartment.amenities.through)
+def clear_apartment_amenities_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        invalidate_apartments(instance.id)
+    elif pk_set:
+        invalidate_apartments(*pk_set)
+    else:
+        # amenity.apartments.clear(): the affected apartments are no longer known.
+        invalidate_tags(AMENITIES_TAG)
+
+
+@receiver(m2m_changed, sender=Apartment.amenities.through)
+def refresh_apartment_amenity_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        refresh_search_index([instance.id])
+    elif pk_set:
+        refresh_search_index(pk_set)
+    elif action == "post_clear":
+        clear_amenity_bit(instance)
+
+
+@receiver(pre_delete, sender=Amenity)
+def clear_deleted_amenity_bit(sender, instance, **kwargs):
+    clear_amenity_bit(instance)
+
+
+@receiver([post_save, post_delete], sender=Amenity)
+def clear_amenity_cache(sender, instance, **kwargs):
+    invalidate_tags(AMENITIES_TAG)
+
+
+@receiver(post_save, sender=ApartmentAvailability)
+def mirror_availability_row(sender, instance, **kwargs):
+    # Legacy per-day writes (admin inline, scripts) are folded into the run-length ranges.
+    set_availability(instance.apartment_id, instance.date, instance.date + timedelta(days=1), instance.is_available)
+
+
+def _deleted_directly(origin, model):
+    # `origin` is the instance or queryset whose delete() started the cascade.
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) is model
+
+
+@receiver(post_delete, sender=ApartmentAvailability)
+def clear_mirrored_availability_row(sender, instance, origin=None, **kwargs):
+    # Deleting the apartment cascades to its runs as well; re-splicing them row by row would be wasted work.
+    if not _deleted_directly(origin, ApartmentAvailability):
+        return
+    clear_availability(instance.apartment_id, instance.date, instance.date + timedelta(days=1))
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=ApartmentPricing)
+@receiver(post_save, sender=ApartmentAddress)
+def refresh_apartment_search_index(sender, instance, **kwargs):
+    apartment_id = instance.id if sender is Apartment else instance.apartment_id
+    refresh_search_index([apartment_id])
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=ApartmentAddress)
+def refresh_apartment_fulltext(sender, instance, **kwargs):
+    apartment_id = instance.id if sender is Apartment else instance.apartment_id
+    index_documents([apartment_id])
+
+
+@receiver(post_delete, sender=ApartmentPricing)
+@receiver(post_delete, sender=ApartmentAddress)
+def refresh_indexes_for_deleted_detail(sender, instance, origin=None, **kwargs):
+    # When the apartment itself is being deleted its index rows go with it.
+    if not _deleted_directly(origin, sender):
+        return
+    refresh_search_index([instance.apartment_id])
+    if sender is ApartmentAddress:
+        index_documents([instance.apartment_id])
+
+
+@receiver(post_delete, sender=Apartment)
+def remove_apartment_fulltext(sender, instance, **kwargs):
+    remove_documents([instance.id])
 
 
-@receiver([post_save, post_delete], sender=ApartmentAvailability)
-def clear_availability_cache(sender, instance, **kwargs):
-    cache.delete(f"apartment:availability:{instance.apartment.id}")
+@receiver([post_save, post_delete], sender=ExchangeRate)
+def recompute_prices_for_rate(sender, instance, **kwargs):
+    reset_rates()
+    recompute_normalized_prices([instance.currency])
@@ -0,0 +1,215 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from .models import Apartment, ApartmentAvailabilityRange, ApartmentRule
+
+# Cached catalog entries are plain tuples of primitives built from values()
+# queries; they unpack into the __slots__ snapshots below, which expose the
+# same attributes ApartmentSerializer reads from model instances.
+
+# Part of every row cache key; bump when the packed row layout changes.
+ROW_FORMAT = 3
+
+APARTMENT_FIELDS = (
+    "id",
+    "host_id",
+    "title",
+    "description",
+    "image",
+    "image_status",
+    "image_variants",
+    "is_cover",
+    "uploaded_at",
+    "property_type",
+    "total_bedrooms",
+    "total_bathrooms",
+    "max_guests",
+    "is_active",
+    "is_verified",
+    "created_at",
+    "updated_at",
+)
+PRICING_FIELDS = ("price_per_night", "cleaning_fee", "service_fee", "weekend_price", "currency")
+ADDRESS_FIELDS = ("country", "state", "city", "street", "latitude", "longitude")
+
+_DATETIME_FIELDS = {"uploaded_at", "created_at", "updated_at"}
+_IMAGE_FIELD = Apartment._meta.get_field("image")
+
+
+class RelatedList(list):
+    """
+    List standing in for a related manager, so `obj.rules.all()` keeps working.
+    """
+    __slots__ = ()
+
+    def all(self):
+        return self
+
+
+class AmenitySnapshot:
+    __slots__ = ("id", "name", "icon")
+
+    def __init__(self, id, name, icon):
+        self.id, self.name, self.icon = id, name, icon
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class RuleSnapshot:
+    __slots__ = ("id", "rule_text")
+
+    def __init__(self, id, rule_text):
+        self.id, self.rule_text = id, rule_text
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class RangeSnapshot:
+    __slots__ = ("start_date", "end_date", "is_available")
+
+    def __init__(self, start, end, is_available):
+        self.start_date = date.fromordinal(start)
+        self.end_date = date.fromordinal(end)
+        self.is_available = is_available
+
+
+class PricingSnapshot:
+    __slots__ = PRICING_FIELDS
+
+    def __init__(self, row):
+        price_per_night, cleaning_fee, service_fee, weekend_price, currency = row
+        self.price_per_night = Decimal(price_per_night)
+        self.cleaning_fee = Decimal(cleaning_fee)
+        self.service_fee = Decimal(service_fee)
+        self.weekend_price = Decimal(weekend_price) if weekend_price is not None else None
+        self.currency = currency
+
+
+class AddressSnapshot:
+    __slots__ = ADDRESS_FIELDS
+
+    def __init__(self, row):
+        self.country, self.state, self.city, self.street, latitude, longitude = row
+        self.latitude = Decimal(latitude) if latitude is not None else None
+        self.longitude = Decimal(longitude) if longitude is not None else None
+
+
+class ApartmentSnapshot:
+    __slots__ = APARTMENT_FIELDS + ("pricing", "address", "amenities", "rules", "availability_ranges")
+
+    def __init__(self, row):
+        fields, pricing, address, amenities, rules, ranges = row
+        for name, value in zip(APARTMENT_FIELDS, fields):
+            if name in _DATETIME_FIELDS and value is not None:
+                value = datetime.fromisoformat(value)
+            setattr(self, name, value)
+        self.pricing = PricingSnapshot(pricing) if pricing is not None else None
+        self.address = AddressSnapshot(address) if address is not None else None
+        self.amenities = RelatedList(AmenitySnapshot(*a) for a in amenities)
+        self.rules = RelatedList(RuleSnapshot(*r) for r in rules)
+        self.availability_ranges = RelatedList(RangeSnapshot(*r) for r in ranges)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def serializable_value(self, field_name):
+        # Mirrors Model.serializable_value: FKs serialize as their raw id.
+        try:
+            return getattr(self, f"{field_name}_id")
+        except AttributeError:
+            return getattr(self, field_name)
+
+    def __str__(self):
+        return self.title
+
+
+def _pack_value(name, value):
+    if name in _DATETIME_FIELDS and value is not None:
+        return value.isoformat()
+    if name == "image":
+        return _IMAGE_FIELD.get_prep_value(value) if value else None
+    return value
+
+
+def _pack_decimal(value):
+    return str(value) if value is not None else None
+
+
+def load_apartment_rows(**filters):
+    """
+    Packed rows for apartments matching `filters`: one values() query for the
+    apartment with pricing/address, plus one per to-many relation.
+    """
+    columns = (
+        list(APARTMENT_FIELDS)
+        + ["pricing__id"] + [f"pricing__{f}" for f in PRICING_FIELDS]
+        + ["address__id"] + [f"address__{f}" for f in ADDRESS_FIELDS]
+    )
+    base = Apartment.objects.filter(**filters).order_by("id").values_list(*columns)
+    related_filters = {f"apartment__{key}": value for key, value in filters.items()}
+
+    amenities = defaultdict(list)
+    for apartment_id, *amenity in (
+        Apartment.amenities.through.objects
+        .filter(**related_filters)
+        .order_by("amenity_id")
+        .values_list("apartment_id", "amenity__id", "amenity__name", "amenity__icon")
+    ):
+        amenities[apartment_id].append(tuple(amenity))
+
+    rules = defaultdict(list)
+    for apartment_id, rule_id, rule_text in (
+        ApartmentRule.objects.filter(**related_filters).order_by("id").values_list("apartment_id", "id", "rule_text")
+    ):
+        rules[apartment_id].append((rule_id, rule_text))
+
+    ranges = defaultdict(list)
+    for apartment_id, start, end, is_available in (
+        ApartmentAvailabilityRange.objects
+        .filter(**related_filters)
+        .order_by("start_date")
+        .values_list("apartment_id", "start_date", "end_date", "is_available")
+    ):
+        ranges[apartment_id].append((start.toordinal(), end.toordinal(), is_available))
+
+    n_apartment, n_pricing = len(APARTMENT_FIELDS), len(PRICING_FIELDS) + 1
+    rows = []
+    for values in base:
+        fields = tuple(_pack_value(name, value) for name, value in zip(APARTMENT_FIELDS, values))
+        pricing_values = values[n_apartment:n_apartment + n_pricing]
+        address_values = values[n_apartment + n_pricing:]
+
+        pricing = None
+        if pricing_values[0] is not None:
+            price, cleaning, service, weekend, currency = pricing_values[1:]
+            pricing = (str(price), str(cleaning), str(service), _pack_decimal(weekend), currency)
+
+        address = None
+        if address_values[0] is not None:
+            country, state, city, street, latitude, longitude = address_values[1:]
+            address = (country, state, city, street, _pack_decimal(latitude), _pack_decimal(longitude))
+
+        apartment_id = fields[0]
+        rows.append((
+            fields,
+            pricing,
+            address,
+            tuple(amenities.get(apartment_id, ())),
+            tuple(rules.get(apartment_id, ())),
+            tuple(ranges.get(apartment_id, ())),
+        ))
+    return rows
+
+
+def to_snapshots(rows):
+    return [ApartmentSnapshot(row) for row in rows]
+
+
+def to_snapshot(row):
+    return ApartmentSnapshot(row) if row is not None else None
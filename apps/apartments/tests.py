@@ -1,3 +1,445 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.user.models import User
+
+from . import local_cache, uploads
+from .availability import clear_availability, get_availability_ranges, merge_ranges, set_availability, splice_range
+from .fast_serializers import compile_serializer, serialize_apartment
+from .models import (
+    IMAGE_FAILED,
+    IMAGE_PROCESSING,
+    IMAGE_READY,
+    Amenity,
+    Apartment,
+    ApartmentAddress,
+    ApartmentAvailabilityRange,
+    ApartmentPricing,
+    ApartmentRule,
+    ExchangeRate,
+)
+from .pricing import count_weekend_nights, is_weekend_night
+from .serializers import ApartmentPricingSerializer, ApartmentSerializer
+from .snapshots import load_apartment_rows, to_snapshot
+
+
+class ApartmentTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.tier.clear()
+        self.host = User.objects.create_user(email="host@example.com", password="pw", first_name="Host", last_name="H")
+        self.apartment = self.create_apartment("Flat")
+        self.client = APIClient()
+        self.day = timezone.localdate() + timedelta(days=30)
+
+    def create_apartment(self, title, **fields):
+        fields = {
+            "description": "d", "property_type": "apartment", "total_bedrooms": 1, "total_bathrooms": 1,
+            "max_guests": 4, "is_verified": True, **fields,
+        }
+        return Apartment.objects.create(host=self.host, title=title, **fields)
+
+    def add_details(self, apartment, price="100.00", city="London", latitude=None, longitude=None):
+        ApartmentPricing.objects.create(apartment=apartment, price_per_night=price)
+        ApartmentAddress.objects.create(
+            apartment=apartment, country="UK", state="", city=city, street="1 High St",
+            latitude=latitude, longitude=longitude,
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse("apartment-search"), params)
+        self.assertEqual(response.status_code, 200)
+        return [apartment["id"] for apartment in response.json()["results"]]
+
+    def night(self, offset):
+        return self.day + timedelta(days=offset)
+
+
+class AvailabilityRangeTests(ApartmentTestCase):
+    def test_merge_joins_touching_runs_with_the_same_status(self):
+        d = date(2030, 1, 1)
+        runs = [(d + timedelta(days=3), d + timedelta(days=5), True), (d, d + timedelta(days=3), True),
+                (d + timedelta(days=5), d + timedelta(days=6), False)]
+
+        self.assertEqual(merge_ranges(runs), [(d, d + timedelta(days=5), True), (d + timedelta(days=5), d + timedelta(days=6), False)])
+
+    def test_splice_splits_the_run_it_lands_in(self):
+        d = date(2030, 1, 1)
+
+        runs = splice_range([(d, d + timedelta(days=10), True)], d + timedelta(days=3), d + timedelta(days=5), False)
+
+        self.assertEqual(runs, [
+            (d, d + timedelta(days=3), True),
+            (d + timedelta(days=3), d + timedelta(days=5), False),
+            (d + timedelta(days=5), d + timedelta(days=10), True),
+        ])
+        self.assertEqual(splice_range(runs, d + timedelta(days=3), d + timedelta(days=5), True), [(d, d + timedelta(days=10), True)])
+
+    def test_writes_are_stored_as_merged_runs(self):
+        set_availability(self.apartment.id, self.night(0), self.night(10))
+        set_availability(self.apartment.id, self.night(4), self.night(6), is_available=False)
+        set_availability(self.apartment.id, self.night(4), self.night(6))
+
+        self.assertEqual(ApartmentAvailabilityRange.objects.filter(apartment=self.apartment).count(), 1)
+        self.assertEqual(get_availability_ranges(self.apartment.id), [(self.night(0), self.night(10), True)])
+
+    def test_reads_are_clipped_to_the_window(self):
+        set_availability(self.apartment.id, self.night(0), self.night(10))
+        clear_availability(self.apartment.id, self.night(2), self.night(3))
+
+        self.assertEqual(get_availability_ranges(self.apartment.id, self.night(1), self.night(5)), [
+            (self.night(1), self.night(2), True),
+            (self.night(3), self.night(5), True),
+        ])
+
+    def test_past_nights_are_not_stored(self):
+        today = timezone.localdate()
+
+        set_availability(self.apartment.id, today - timedelta(days=5), today + timedelta(days=2))
+
+        self.assertEqual(get_availability_ranges(self.apartment.id), [(today, today + timedelta(days=2), True)])
+
+
+class AvailabilityWindowTests(ApartmentTestCase):
+    def get_window(self, start, end):
+        return self.client.get(
+            reverse("apartment-availability", kwargs={"pk": self.apartment.id}),
+            {"from": start.isoformat(), "to": end.isoformat()},
+        )
+
+    def test_window_is_filled_with_blocked_nights(self):
+        set_availability(self.apartment.id, self.night(2), self.night(4))
+
+        response = self.get_window(self.night(0), self.night(6))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ranges"], [
+            {"start": self.night(0).isoformat(), "end": self.night(2).isoformat(), "is_available": False},
+            {"start": self.night(2).isoformat(), "end": self.night(4).isoformat(), "is_available": True},
+            {"start": self.night(4).isoformat(), "end": self.night(6).isoformat(), "is_available": False},
+        ])
+
+    def test_window_across_months_returns_one_run(self):
+        start = (self.day + timedelta(days=32)).replace(day=20)
+        end = start + timedelta(days=25)
+        set_availability(self.apartment.id, start, end)
+
+        response = self.get_window(start, end)
+
+        self.assertEqual(response.json()["ranges"], [
+            {"start": start.isoformat(), "end": end.isoformat(), "is_available": True},
+        ])
+
+    def test_cached_window_sees_later_writes(self):
+        self.get_window(self.night(0), self.night(6))
+        with self.captureOnCommitCallbacks(execute=True):
+            set_availability(self.apartment.id, self.night(0), self.night(6))
+
+        response = self.get_window(self.night(0), self.night(6))
+
+        self.assertEqual(response.json()["ranges"], [
+            {"start": self.night(0).isoformat(), "end": self.night(6).isoformat(), "is_available": True},
+        ])
+
+    def test_window_must_end_after_it_starts(self):
+        response = self.get_window(self.night(3), self.night(3))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("to", response.json())
+
+
+class SearchIndexRefreshTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_details(self.apartment)
+
+    def test_pricing_change_is_searchable(self):
+        self.assertEqual(self.search(max_price=150), [self.apartment.id])
+
+        pricing = self.apartment.pricing
+        pricing.price_per_night = "200.00"
+        pricing.save()
+
+        self.assertEqual(self.search(max_price=150), [])
+        self.assertEqual(self.search(min_price=150), [self.apartment.id])
+
+    def test_address_change_is_searchable(self):
+        address = self.apartment.address
+        address.city = "Leeds"
+        address.save()
+
+        self.assertEqual(self.search(city="london"), [])
+        self.assertEqual(self.search(city="Leeds"), [self.apartment.id])
+        self.assertEqual(self.search(q="leeds"), [self.apartment.id])
+
+    def test_deleted_pricing_and_address_leave_the_index(self):
+        ApartmentPricing.objects.filter(apartment=self.apartment).delete()
+        ApartmentAddress.objects.filter(apartment=self.apartment).delete()
+
+        self.assertEqual(self.search(min_price=1), [])
+        self.assertEqual(self.search(city="london"), [])
+        self.assertEqual(self.search(q="london"), [])
+        self.assertEqual(self.search(), [self.apartment.id])
+
+
+class RadiusSearchTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_details(self.apartment, latitude="51.500000", longitude="-0.120000")
+        self.near = self.create_apartment("Near")
+        self.add_details(self.near, latitude="51.510000", longitude="-0.100000")
+        self.far = self.create_apartment("Far")
+        self.add_details(self.far, city="Paris", latitude="48.850000", longitude="2.350000")
+
+    def test_results_are_within_the_radius_nearest_first(self):
+        self.assertEqual(self.search(near="51.509,-0.101,5"), [self.near.id, self.apartment.id])
+        self.assertEqual(len(self.search(near="51.5,-0.12,400")), 3)
+
+    def test_radius_wraps_the_antimeridian(self):
+        east = self.create_apartment("East")
+        self.add_details(east, city="Suva", latitude="-17.000000", longitude="179.900000")
+        west = self.create_apartment("West")
+        self.add_details(west, city="Suva", latitude="-17.000000", longitude="-179.950000")
+
+        self.assertEqual(self.search(near="-17,179.99,30"), [west.id, east.id])
+        self.assertEqual(self.search(near="-17,-179.99,30"), [west.id, east.id])
+
+    def test_invalid_radius_is_rejected(self):
+        response = self.client.get(reverse("apartment-search"), {"near": "51.5,-0.12,0"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(5):
+            self.create_apartment(f"Flat {number}")
+        # Ties on created_at are broken by id.
+        Apartment.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def walk(self, url, on_page=None):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [apartment["id"] for apartment in response.json()["results"]]
+            url = response.json()["next"]
+            if on_page is not None:
+                on_page()
+        return ids
+
+    def test_pages_are_stable_under_inserts(self):
+        expected = list(Apartment.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        ids = self.walk(
+            reverse("apartment-list-create") + "?pagination=cursor&page_size=2",
+            on_page=lambda: self.create_apartment("Inserted"),
+        )
+
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get(reverse("apartment-list-create"), {"pagination": "cursor", "page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+
+        previous = self.client.get(second["previous"]).json()
+
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse("apartment-list-create"), {"cursor": "nope"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_details(self.apartment)
+        self.url = reverse("apartment-detail", kwargs={"pk": self.apartment.id})
+
+    def test_fields_picks_a_subset(self):
+        response = self.client.get(self.url, {"fields": "id,title,pricing"})
+
+        self.assertEqual(set(response.json()), {"id", "title", "pricing"})
+        self.assertEqual(response.json()["pricing"]["price_per_night"], "100.00")
+
+    def test_omit_and_expand(self):
+        data = self.client.get(self.url, {"omit": "description,rules"}).json()
+        self.assertNotIn("description", data)
+        self.assertNotIn("rules", data)
+        self.assertNotIn("availability", data)
+
+        data = self.client.get(self.url, {"fields": "id", "expand": "availability"}).json()
+        self.assertEqual(set(data), {"id", "availability"})
+
+    def test_unrequested_relations_are_not_loaded(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {"fields": "id,title"})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.url, {"fields": "id,nope"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": "Unknown field(s): nope"})
+
+
+class StayQuoteTests(ApartmentTestCase):
+    # 2030-01-07 is a Monday.
+    monday = date(2030, 1, 7)
+
+    def setUp(self):
+        super().setUp()
+        self.add_details(self.apartment)
+        ApartmentPricing.objects.filter(apartment=self.apartment).update(
+            weekend_price="150.00", cleaning_fee="20.00", service_fee="5.00",
+        )
+
+    def get_quotes(self, ids, check_in, check_out, **params):
+        return self.client.get(reverse("apartment-quotes"), {
+            "ids": ",".join(str(apartment_id) for apartment_id in ids),
+            "check_in": check_in.isoformat(),
+            "check_out": check_out.isoformat(),
+            **params,
+        })
+
+    def test_weekend_nights_are_counted_across_whole_weeks(self):
+        for start in range(7):
+            for nights in (0, 1, 3, 7, 9, 16):
+                check_in = self.monday + timedelta(days=start)
+                expected = sum(is_weekend_night(check_in + timedelta(days=offset)) for offset in range(nights))
+                self.assertEqual(count_weekend_nights(check_in, check_in + timedelta(days=nights)), expected)
+
+    def test_weekly_stay_charges_friday_and_saturday_at_the_weekend_rate(self):
+        response = self.get_quotes([self.apartment.id], self.monday, self.monday + timedelta(days=14))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{
+            "apartment": self.apartment.id, "currency": "GBP", "nights": 14, "weekend_nights": 4,
+            "subtotal": "1600.00", "cleaning_fee": "20.00", "service_fee": "5.00", "total": "1625.00",
+        }])
+
+    def test_breakdown_lists_each_nightly_rate(self):
+        friday = self.monday + timedelta(days=4)
+
+        quote = self.get_quotes([self.apartment.id], friday - timedelta(days=1), friday + timedelta(days=2),
+                                breakdown="true").json()[0]
+
+        self.assertEqual([night["price"] for night in quote["nightly"]], ["100.00", "150.00", "150.00"])
+        self.assertEqual(quote["subtotal"], "400.00")
+
+    def test_apartments_without_pricing_or_inactive_are_left_out(self):
+        unpriced = self.create_apartment("Unpriced")
+        inactive = self.create_apartment("Inactive", is_active=False)
+        self.add_details(inactive)
+
+        response = self.get_quotes([self.apartment.id, unpriced.id, inactive.id], self.monday, self.monday + timedelta(days=1))
+
+        self.assertEqual([quote["apartment"] for quote in response.json()], [self.apartment.id])
+
+
+class FailingUploader:
+    calls = 0
+
+    def upload(self, path, folder):
+        FailingUploader.calls += 1
+        raise ConnectionError("upload refused")
+
+
+class ImageUploadTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(override_settings(
+            IMAGE_UPLOADER="apps.apartments.uploads.LocalFilesystemUploader",
+            IMAGE_SPOOL_DIR=root / "spool",
+            IMAGE_LOCAL_STORAGE_DIR=root / "uploads",
+            IMAGE_LOCAL_STORAGE_URL="/media/uploads/",
+        ))
+
+    def image_file(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), "red").save(buffer, "JPEG")
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_goes_from_processing_to_ready(self):
+        with mock.patch.object(uploads, "enqueue") as enqueue, self.captureOnCommitCallbacks(execute=True):
+            path = uploads.accept_image_upload(self.apartment, self.image_file())
+        self.apartment.refresh_from_db()
+        self.assertEqual(self.apartment.image_status, IMAGE_PROCESSING)
+        enqueue.assert_called_once_with(path)
+
+        self.assertTrue(uploads.process_spooled(path))
+
+        self.apartment.refresh_from_db()
+        self.assertEqual(self.apartment.image_status, IMAGE_READY)
+        self.assertEqual(set(self.apartment.image_variants), {"original", *uploads.IMAGE_VARIANTS})
+        self.assertEqual(self.apartment.image_variants["card"]["width"], 480)
+        self.assertEqual(uploads.pending_uploads(), [])
+
+    def test_upload_is_marked_failed_after_its_retries(self):
+        FailingUploader.calls = 0
+        with mock.patch.object(uploads, "enqueue"):
+            path = uploads.accept_image_upload(self.apartment, self.image_file())
+
+        with (
+            override_settings(IMAGE_UPLOADER="apps.apartments.tests.FailingUploader"),
+            mock.patch.object(uploads, "RETRY_BACKOFF", 0),
+            self.assertLogs("apps.apartments.uploads", "WARNING") as logs,
+        ):
+            self.assertFalse(uploads.process_spooled(path, retries=2))
+
+        self.apartment.refresh_from_db()
+        self.assertEqual(self.apartment.image_status, IMAGE_FAILED)
+        self.assertEqual(FailingUploader.calls, 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(uploads.pending_uploads(), [])
+        self.assertEqual(len(uploads.pending_uploads(retry_failed=True)), 1)
+
+
+class FastSerializerTests(ApartmentTestCase):
+    def setUp(self):
+        super().setUp()
+        cloudinary.config(cloud_name="demo")
+        self.add_details(self.apartment, latitude="51.500000", longitude="-0.120000")
+        self.apartment.amenities.set([Amenity.objects.create(name="Wifi"), Amenity.objects.create(name="Pool")])
+        ApartmentRule.objects.create(apartment=self.apartment, rule_text="No parties")
+        set_availability(self.apartment.id, self.night(0), self.night(5))
+        Apartment.objects.filter(pk=self.apartment.pk).update(
+            image="image/upload/v1/apartments/photo.jpg", image_variants={"card": {"url": "u", "width": 480, "height": 320}},
+        )
+
+    def test_matches_the_drf_serializer(self):
+        bare = self.create_apartment("Bare")
+        for apartment in Apartment.objects.filter(pk__in=[self.apartment.pk, bare.pk]):
+            self.assertEqual(serialize_apartment(apartment), ApartmentSerializer(apartment).data)
+
+    def test_matches_the_drf_serializer_on_snapshots(self):
+        apartment = Apartment.objects.get(pk=self.apartment.pk)
+        snapshot = to_snapshot(load_apartment_rows(id=self.apartment.pk)[0])
+
+        self.assertEqual(serialize_apartment(snapshot), ApartmentSerializer(apartment).data)
+
+    def test_overridden_to_representation_is_kept(self):
+        ExchangeRate.objects.create(currency="USD", rate="0.80")
+        serializer = ApartmentPricingSerializer(context={"display_currency": "USD"})
+
+        data = compile_serializer(serializer)(self.apartment.pricing)
+
+        self.assertEqual(data, ApartmentPricingSerializer(self.apartment.pricing, context={"display_currency": "USD"}).data)
+        self.assertEqual(data["display_price_per_night"], "125.00")
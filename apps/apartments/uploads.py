@@ -0,0 +1,221 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from .cache import invalidate_apartments
+from .models import IMAGE_FAILED, IMAGE_PROCESSING, IMAGE_READY, Apartment
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = "apartments"
+RETRY_BACKOFF = 1.0
+STALE_CLAIM_SECONDS = 60 * 60
+
+# Resized copies made at upload time, cropped to fill: name -> (width, height).
+IMAGE_VARIANTS = {
+    "thumb": (160, 120),
+    "card": (480, 320),
+    "hero": (1600, 900),
+}
+
+# Spool layout: new files at the top level, claimed ones in working/, given-up ones in failed/.
+WORKING_DIR = "working"
+FAILED_DIR = "failed"
+
+
+# Uploaders return (image, variants): the Cloudinary resource stored in
+# Apartment.image (None for files kept elsewhere) and {name: {"url", "width",
+# "height"}} for "original" plus every entry of IMAGE_VARIANTS.
+
+
+class CloudinaryUploader:
+    def upload(self, path, folder):
+        import cloudinary.uploader
+        eager = [{"width": width, "height": height, "crop": "fill"} for width, height in IMAGE_VARIANTS.values()]
+        resource = cloudinary.uploader.upload_resource(
+            str(path), folder=folder, type="upload", resource_type="image", eager=eager,
+        )
+        metadata = resource.metadata
+        variants = {
+            "original": {"url": metadata["secure_url"], "width": metadata.get("width"), "height": metadata.get("height")},
+        }
+        variants.update(
+            (name, {"url": derived["secure_url"], "width": derived["width"], "height": derived["height"]})
+            for name, derived in zip(IMAGE_VARIANTS, metadata.get("eager", []))
+        )
+        return resource, variants
+
+
+class LocalFilesystemUploader:
+    """
+    Stand-in that copies files under IMAGE_LOCAL_STORAGE_DIR and resizes them
+    with Pillow, for development and offline runs. The files are not on
+    Cloudinary, so Apartment.image is cleared and the original's local URL is
+    kept in the variants instead.
+    """
+
+    def upload(self, path, folder):
+        target = Path(settings.IMAGE_LOCAL_STORAGE_DIR) / folder
+        target.mkdir(parents=True, exist_ok=True)
+        base_url = f"{settings.IMAGE_LOCAL_STORAGE_URL}{folder}/"
+
+        with Image.open(path) as original:
+            original = ImageOps.exif_transpose(original).convert("RGB")
+            variants = {"original": {"url": base_url + path.name, "width": original.width, "height": original.height}}
+            for name, size in IMAGE_VARIANTS.items():
+                filename = f"{path.stem}_{name}.jpg"
+                ImageOps.fit(original, size).save(target / filename, "JPEG", quality=85, optimize=True)
+                variants[name] = {"url": base_url + filename, "width": size[0], "height": size[1]}
+
+        shutil.copyfile(path, target / path.name)
+        return None, variants
+
+
+def get_uploader():
+    return import_string(settings.IMAGE_UPLOADER)()
+
+
+def _spool_dir(*parts):
+    path = Path(settings.IMAGE_SPOOL_DIR).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def spool_image(apartment_id, file):
+    """
+    Writes an uploaded file to the spool as `<apartment_id>-<uuid><ext>`.
+    """
+    suffix = Path(file.name or "").suffix.lower()[:10]
+    path = _spool_dir() / f"{apartment_id}-{uuid.uuid4().hex}{suffix}"
+    with open(path, "wb") as out:
+        for chunk in file.chunks():
+            out.write(chunk)
+    return path
+
+
+def _claim(path):
+    # rename() is atomic, so a file is processed by whoever moves it first.
+    claimed = _spool_dir(WORKING_DIR) / path.name
+    try:
+        if path == claimed:
+            os.utime(claimed)
+        else:
+            os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def _set_status(apartment_id, **fields):
+    Apartment.objects.filter(pk=apartment_id).update(updated_at=timezone.now(), **fields)
+    invalidate_apartments(apartment_id)
+
+
+def process_spooled(path, retries=None):
+    """
+    Uploads one spooled file with retries and stores the result on its
+    apartment. Returns True on success; after the last failed attempt the
+    apartment is marked failed and the file is kept in failed/.
+    """
+    path = _claim(Path(path))
+    if path is None:
+        return False
+    apartment_id = int(path.name.split("-", 1)[0])
+    retries = retries or settings.IMAGE_UPLOAD_RETRIES
+    uploader = get_uploader()
+
+    for attempt in range(retries):
+        try:
+            image, variants = uploader.upload(path, UPLOAD_FOLDER)
+            break
+        except Exception:
+            logger.warning("Image upload for apartment %s failed (attempt %s/%s)",
+                           apartment_id, attempt + 1, retries, exc_info=True)
+            if attempt + 1 < retries:
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    else:
+        os.replace(path, _spool_dir(FAILED_DIR) / path.name)
+        _set_status(apartment_id, image_status=IMAGE_FAILED)
+        return False
+
+    _set_status(
+        apartment_id, image=image, image_variants=variants, image_status=IMAGE_READY, uploaded_at=timezone.now(),
+    )
+    path.unlink(missing_ok=True)
+    return True
+
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_guard = threading.Lock()
+
+
+def _pool():
+    global _executor, _executor_pid, _slots
+    with _executor_guard:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix="image-upload")
+            _slots = threading.BoundedSemaphore(settings.IMAGE_UPLOAD_QUEUE_SIZE)
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def _run(path):
+    try:
+        process_spooled(path)
+    except Exception:
+        logger.exception("Image upload worker crashed on %s", path)
+    finally:
+        connections.close_all()
+
+
+def enqueue(path):
+    """
+    Hands a spooled file to the worker pool. When IMAGE_UPLOAD_QUEUE_SIZE
+    uploads are already pending the file just stays spooled for
+    `manage.py process_image_uploads`, so request threads never block.
+    """
+    pool, slots = _pool()
+    if not slots.acquire(blocking=False):
+        logger.warning("Image upload queue full; %s left in the spool", path.name)
+        return False
+    pool.submit(_run, path).add_done_callback(lambda future: slots.release())
+    return True
+
+
+def accept_image_upload(apartment, file):
+    """
+    Spools `file` for `apartment`, marks it processing and queues the upload
+    once the surrounding transaction commits.
+    """
+    path = spool_image(apartment.pk, file)
+    apartment.image_status = IMAGE_PROCESSING
+    _set_status(apartment.pk, image_status=IMAGE_PROCESSING)
+    transaction.on_commit(lambda: enqueue(path))
+    return path
+
+
+def pending_uploads(retry_failed=False):
+    """
+    Spooled files waiting for an upload: new ones, claims abandoned by a
+    crashed worker and, with `retry_failed`, ones that ran out of retries.
+    """
+    spool = _spool_dir()
+    paths = [path for path in spool.iterdir() if path.is_file()]
+    stale_before = time.time() - STALE_CLAIM_SECONDS
+    paths += [path for path in _spool_dir(WORKING_DIR).iterdir() if path.stat().st_mtime < stale_before]
+    if retry_failed:
+        paths += list(_spool_dir(FAILED_DIR).iterdir())
+    return sorted(paths, key=lambda path: path.stat().st_mtime)
@@ -1,7 +1,20 @@
 from django.urls import path
-from .views import ApartmentListCreateView, ApartmentDetailView
+from .views import (
+    ApartmentListAPIView,
+    ApartmentDetailAPIView,
+    ApartmentListCreateView,
+    ApartmentDetailView,
+    ApartmentSearchView,
+    ApartmentAvailabilityView,
+    StayQuoteView,
+)
 
 urlpatterns = [
     path('apartments/', ApartmentListCreateView.as_view(), name='apartment-list-create'),
+    path('catalog/', ApartmentListAPIView.as_view(), name='apartment-catalog'),
+    path('catalog/<int:pk>/', ApartmentDetailAPIView.as_view(), name='apartment-catalog-detail'),
+    path('apartments/search/', ApartmentSearchView.as_view(), name='apartment-search'),
+    path('apartments/quotes/', StayQuoteView.as_view(), name='apartment-quotes'),
     path('apartments/<int:pk>/', ApartmentDetailView.as_view(), name='apartment-detail'),
+    path('apartments/<int:pk>/availability/', ApartmentAvailabilityView.as_view(), name='apartment-availability'),
 ]
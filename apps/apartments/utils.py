@@ -21,50 +21,41 @@ def upload_apartment_image(file, folder="apartments"):
         raise Exception(f"Cloudinary upload failed: {e}")
     
 
-from django.core.cache import cache
-from .models import Apartment
+from .cache import LIST_TAGS, detail_tags, read_through
+from .snapshots import ROW_FORMAT, load_apartment_rows, to_snapshot, to_snapshots
 
 CACHE_TIMEOUT = 60 * 500
+LIST_CACHE_KEY = f"apartments:rows:v{ROW_FORMAT}:active_verified"
+
+
+def detail_cache_key(apartment_id):
+    return f"apartments:rows:v{ROW_FORMAT}:detail:{apartment_id}"
 
 
 def get_cached_active_apartments():
     """
-    Returns cached active & verified apartments with all relations
+    Returns cached active & verified apartments with all relations,
+    as snapshots (the cache holds packed tuples, not model instances)
     """
-    cache_key = "apartments:active_verified"
-
-    apartments = cache.get(cache_key)
-    if apartments is None:
-        apartments = (
-            Apartment.objects
-            .filter(is_active=True, is_verified=True)
-            .select_related("pricing", "address")
-            .prefetch_related("amenities", "rules", "availability")
-        )
-        apartments = list(apartments)  
-        cache.set(cache_key, apartments, CACHE_TIMEOUT)
-
-    return apartments
+    rows = read_through(
+        LIST_CACHE_KEY,
+        LIST_TAGS,
+        lambda: load_apartment_rows(is_active=True, is_verified=True),
+        CACHE_TIMEOUT,
+    )
+    return to_snapshots(rows)
 
 
 def get_cached_apartment_detail(apartment_id):
     """
     Cache single apartment detail
     """
-    cache_key = f"apartments:detail:{apartment_id}"
-
-    apartment = cache.get(cache_key)
-    if apartment is None:
-        apartment = (
-            Apartment.objects
-            .select_related("pricing", "address")
-            .prefetch_related("amenities", "rules", "availability")
-            .filter(id=apartment_id, is_active=True)
-            .first()
-        )
-        cache.set(cache_key, apartment, CACHE_TIMEOUT)
-
-    return apartment
+    def load():
+        rows = load_apartment_rows(id=apartment_id, is_active=True)
+        return rows[0] if rows else None
+
+    row = read_through(detail_cache_key(apartment_id), detail_tags(apartment_id), load, CACHE_TIMEOUT)
+    return to_snapshot(row)
 
     
 
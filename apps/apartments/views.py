@@ -1,25 +1,61 @@
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from django.core.files.uploadedfile import UploadedFile
 from django.shortcuts import get_object_or_404
 
-from .models import Apartment, Amenity
-from .serializers import ApartmentSerializer
+from apps.base.pagination import OptInCursorPagination
+from apps.base.sparse_fields import SparseFieldsViewMixin
+
+from .filters import ApartmentSearchFilter
+from .models import CURRENCY, Apartment, Amenity
+from .cache import LIST_TAGS, detail_tags
+from .response_cache import DETAIL_RESPONSE_KEY, LIST_RESPONSE_KEY, cached_json_response
+from .fast_serializers import serialize_apartment, serialize_apartments
+from .availability import fill_gaps, upsert_availability
+from .pricing import quote_apartments
+from .serializers import (
+    ApartmentAvailabilityWindowSerializer,
+    ApartmentSerializer,
+    AvailabilityRangeSerializer,
+    AvailabilityUpsertSerializer,
+    AvailabilityWindowQuerySerializer,
+    StayQuoteRequestSerializer,
+    StayQuoteSerializer,
+)
+from .services import get_apartment_availability
+from .uploads import accept_image_upload
 from .utils import (
     get_cached_active_apartments,
     get_cached_apartment_detail
 )
 
+# Serializer field -> relation loaded for it; ?fields=/?omit= skip the ones not rendered.
+APARTMENT_RELATIONS = {
+    "pricing": ("select_related", "pricing"),
+    "address": ("select_related", "address"),
+    "apartment_amenities": ("prefetch_related", "amenities"),
+    "rules": ("prefetch_related", "rules"),
+    "availability_ranges": ("prefetch_related", "availability_ranges"),
+    "availability": ("prefetch_related", "availability_ranges"),
+}
+
+
 class ApartmentListAPIView(APIView):
     permission_classes = [AllowAny]
 
     @swagger_auto_schema(responses={200: ApartmentSerializer(many=True)})
     def get(self, request):
-        apartments = get_cached_active_apartments()  
-        serializer = ApartmentSerializer(apartments, many=True)
-        return Response(serializer.data)
+        return cached_json_response(
+            request,
+            LIST_RESPONSE_KEY,
+            LIST_TAGS,
+            lambda: serialize_apartments(get_cached_active_apartments()),
+        )
 
 
 class ApartmentDetailAPIView(APIView):
@@ -27,19 +63,22 @@ class ApartmentDetailAPIView(APIView):
 
     @swagger_auto_schema(responses={200: ApartmentSerializer})
     def get(self, request, pk):
-        apartment = get_cached_apartment_detail(pk)  
+        def build():
+            apartment = get_cached_apartment_detail(pk)
+            return serialize_apartment(apartment) if apartment is not None else None
 
-        if apartment is None:
+        response = cached_json_response(request, DETAIL_RESPONSE_KEY.format(id=pk), detail_tags(pk), build)
+        if response is None:
             return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        return response
 
-        serializer = ApartmentSerializer(apartment)
-        return Response(serializer.data)
 
-
-class ApartmentListCreateView(generics.ListCreateAPIView):
-    queryset = Apartment.objects.filter(is_active=True)
+class ApartmentListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
+    queryset = Apartment.objects.filter(is_active=True).order_by("-created_at", "-id")
+    sparse_relations = APARTMENT_RELATIONS
     serializer_class = ApartmentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
 
     @swagger_auto_schema(responses={200: ApartmentSerializer(many=True)})
     def get(self, request, *args, **kwargs):
@@ -55,6 +94,10 @@ class ApartmentListCreateView(generics.ListCreateAPIView):
 
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
+        image = serializer.validated_data.get("image")
+        if isinstance(image, UploadedFile):
+            # Uploaded in the background; see uploads.accept_image_upload.
+            del serializer.validated_data["image"]
 
         apartment = serializer.save(host=request.user)
 
@@ -62,6 +105,9 @@ class ApartmentListCreateView(generics.ListCreateAPIView):
             amenities = Amenity.objects.filter(id__in=amenities_ids)
             apartment.amenities.set(amenities)
 
+        if isinstance(image, UploadedFile):
+            accept_image_upload(apartment, image)
+
         
         return Response(
             ApartmentSerializer(apartment).data,
@@ -69,8 +115,32 @@ class ApartmentListCreateView(generics.ListCreateAPIView):
         )
 
 
-class ApartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ApartmentSearchView(SparseFieldsViewMixin, generics.ListAPIView):
+    queryset = (
+        Apartment.objects
+        .filter(search_index__is_active=True, search_index__is_verified=True)
+        .order_by("-search_index__created_at")
+    )
+    serializer_class = ApartmentSerializer
+    permission_classes = [AllowAny]
+    filterset_class = ApartmentSearchFilter
+    sparse_relations = APARTMENT_RELATIONS
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        currency = self.request.query_params.get("currency")
+        if currency in dict(CURRENCY):
+            context["display_currency"] = currency
+        return context
+
+    @swagger_auto_schema(responses={200: ApartmentSerializer(many=True)})
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ApartmentDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Apartment.objects.all()
+    sparse_relations = APARTMENT_RELATIONS
     serializer_class = ApartmentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = "pk"
@@ -97,12 +167,19 @@ class ApartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
         serializer = self.get_serializer(apartment, data=data, partial=True)
         serializer.is_valid(raise_exception=True)
+        image = serializer.validated_data.get("image")
+        if isinstance(image, UploadedFile):
+            # Uploaded in the background; see uploads.accept_image_upload.
+            del serializer.validated_data["image"]
         apartment = serializer.save()
 
         if amenities_ids:
             amenities = Amenity.objects.filter(id__in=amenities_ids)
             apartment.amenities.set(amenities)
 
+        if isinstance(image, UploadedFile):
+            accept_image_upload(apartment, image)
+
 
         return Response(
             ApartmentSerializer(apartment).data,
@@ -119,3 +196,84 @@ class ApartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
             )
 
         return super().delete(request, *args, **kwargs)
+
+
+class ApartmentAvailabilityView(APIView):
+    """
+    Availability of one apartment over [from, to) as runs of nights; hosts
+    POST spans to set many nights at once.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter("from", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter("to", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description="Exclusive; defaults to 90 days after `from`."),
+        ],
+        responses={200: ApartmentAvailabilityWindowSerializer},
+    )
+    def get(self, request, pk):
+        params = AvailabilityWindowQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start, end = params.validated_data["start"], params.validated_data["end"]
+
+        if get_cached_apartment_detail(pk) is None:
+            return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        ranges = fill_gaps(get_apartment_availability(pk, start, end), start, end)
+        return Response({
+            "apartment": pk,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "ranges": [
+                {"start": r_start.isoformat(), "end": r_end.isoformat(), "is_available": is_available}
+                for r_start, r_end, is_available in ranges
+            ],
+        })
+
+    @swagger_auto_schema(
+        request_body=AvailabilityUpsertSerializer,
+        responses={200: AvailabilityRangeSerializer(many=True)},
+    )
+    def post(self, request, pk):
+        apartment = get_object_or_404(Apartment, pk=pk)
+        if apartment.host != request.user:
+            return Response(
+                {"error": "Not allowed"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = AvailabilityUpsertSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        spans = [(s["start"], s["end"], s["is_available"]) for s in serializer.validated_data["ranges"]]
+
+        ranges = upsert_availability(apartment.id, spans)
+        return Response([
+            {"start": r_start.isoformat(), "end": r_end.isoformat(), "is_available": is_available}
+            for r_start, r_end, is_available in ranges
+        ])
+
+
+class StayQuoteView(APIView):
+    """
+    Prices one stay for many apartments (e.g. a page of search results) in one pass.
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        query_serializer=StayQuoteRequestSerializer,
+        responses={200: StayQuoteSerializer(many=True)},
+    )
+    def get(self, request):
+        params = StayQuoteRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = params.validated_data["ids"]
+        quotes = quote_apartments(
+            ids,
+            params.validated_data["check_in"],
+            params.validated_data["check_out"],
+            breakdown=params.validated_data["breakdown"],
+        )
+        results = [{"apartment": apartment_id, **quotes[apartment_id]} for apartment_id in ids if apartment_id in quotes]
+        return Response(StayQuoteSerializer(results, many=True).data)
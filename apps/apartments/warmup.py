@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import LIST_TAGS, detail_tags, set_many_versioned, stale_keys
+from .models import Apartment
+from .snapshots import load_apartment_rows
+from .utils import CACHE_TIMEOUT, LIST_CACHE_KEY, detail_cache_key
+
+logger = logging.getLogger(__name__)
+
+WARM_BATCH_SIZE = 500
+WARMUP_LOCK_KEY = "apartments:warmup:lock"
+WARMUP_LOCK_TIMEOUT = 60 * 10
+
+
+def _warm_list(force):
+    stale = stale_keys({LIST_CACHE_KEY: LIST_TAGS}, force)
+    if not stale:
+        return 0
+    rows = load_apartment_rows(is_active=True, is_verified=True)
+    set_many_versioned({LIST_CACHE_KEY: (rows, stale[LIST_CACHE_KEY])}, CACHE_TIMEOUT)
+    return 1
+
+
+def _warm_details(ids, force):
+    """
+    Refreshes the detail entries of `ids` that are missing or out of date:
+    one get_many to find them, one batched load and one set_many to write them.
+    """
+    try:
+        stale = stale_keys({detail_cache_key(apartment_id): detail_tags(apartment_id) for apartment_id in ids}, force)
+        if not stale:
+            return 0
+        stale_ids = [apartment_id for apartment_id in ids if detail_cache_key(apartment_id) in stale]
+        rows = {row[0][0]: row for row in load_apartment_rows(id__in=stale_ids, is_active=True)}
+        set_many_versioned(
+            {
+                detail_cache_key(apartment_id): (rows.get(apartment_id), stale[detail_cache_key(apartment_id)])
+                for apartment_id in stale_ids
+            },
+            CACHE_TIMEOUT,
+        )
+        return len(stale_ids)
+    finally:
+        # Runs on pool threads, which each hold their own connection.
+        connections.close_all()
+
+
+def warm_catalog(batch_size=WARM_BATCH_SIZE, workers=1, force=False, progress=None):
+    """
+    Warms the catalog list and every active apartment's detail entry.
+
+    Details are processed in batches of `batch_size` spread over `workers`
+    threads; entries whose tag versions are unchanged are skipped unless
+    `force` is set. `progress(done, total, written)` is called after each
+    batch. Returns a summary dict.
+    """
+    started = time.monotonic()
+    written = _warm_list(force)
+
+    ids = list(Apartment.objects.filter(is_active=True).order_by("id").values_list("id", flat=True))
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="catalog-warm") as pool:
+        for batch, count in zip(batches, pool.map(lambda batch: _warm_details(batch, force), batches)):
+            done += len(batch)
+            written += count
+            if progress is not None:
+                progress(done, len(ids), written)
+
+    return {
+        "apartments": len(ids),
+        "written": written,
+        "skipped": len(ids) + 1 - written,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def _warm_under_lock():
+    token = uuid.uuid4().hex
+    if not cache.add(WARMUP_LOCK_KEY, token, WARMUP_LOCK_TIMEOUT):
+        return
+    try:
+        summary = warm_catalog(workers=settings.CATALOG_WARM_WORKERS)
+        logger.info("Catalog cache warmed on start: %s", summary)
+    except Exception:
+        logger.exception("Catalog cache warm-up failed")
+    finally:
+        if cache.get(WARMUP_LOCK_KEY) == token:
+            cache.delete(WARMUP_LOCK_KEY)
+
+
+def warm_on_start():
+    """
+    Warms the catalog cache in the background when CATALOG_WARM_ON_START is
+    set. Workers booting together race for a cache lock and only the winner
+    warms; a later boot re-checks, but only rewrites entries that changed.
+    """
+    if not settings.CATALOG_WARM_ON_START:
+        return
+    threading.Thread(target=_warm_under_lock, name="catalog-warmup", daemon=True).start()
@@ -3,4 +3,4 @@ from django.apps import AppConfig
 
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'base'
+    name = 'apps.base'
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.base.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL = timedelta(hours=24)
+IN_PROGRESS_TTL = timedelta(seconds=60)
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = openapi.Parameter(
+    IDEMPOTENCY_HEADER,
+    openapi.IN_HEADER,
+    type=openapi.TYPE_STRING,
+    required=False,
+    description="Retries with the same key replay the first response instead of running again.",
+)
+
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{payload}".encode()).hexdigest()
+
+
+def _claim(scope, user, key_hash, fingerprint):
+    """
+    Returns `(record, claimed)`. `claimed` is True when this request owns the
+    key and should run the view; `record` is None when another request took
+    the key over at the same moment.
+    """
+    now = timezone.now()
+    lookup = {"scope": scope, "user": user, "key_hash": key_hash}
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                **lookup, fingerprint=fingerprint, expires_at=now + IN_PROGRESS_TTL,
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(**lookup).first()
+    if record is None or record.expires_at > now:
+        return record, False
+
+    # The earlier claim or response has expired: take the key over, unless a
+    # concurrent retry got there first.
+    taken = IdempotencyKey.objects.filter(pk=record.pk, expires_at=record.expires_at).update(
+        state=IdempotencyKey.IN_PROGRESS,
+        fingerprint=fingerprint,
+        response_data=None,
+        status_code=None,
+        expires_at=now + IN_PROGRESS_TTL,
+    )
+    if not taken:
+        return None, False
+    record.refresh_from_db()
+    return record, True
+
+
+def idempotent(scope):
+    """
+    Makes a view method honour the Idempotency-Key header.
+
+    The first request with a key runs normally and its response is kept in
+    the database for IDEMPOTENCY_TTL; retries with the same key and body get
+    that response back, marked with `Idempotent-Replayed: true`, without
+    running the view again. Error responses are kept too, including those
+    raised as DRF exceptions, so a rejected request is not retried into a
+    different outcome. Only 5xx responses and unhandled exceptions release
+    the key. Keys are per user and `scope`; anonymous requests run without
+    it. Reusing a key for a different body is a 422, and a retry that
+    arrives while the first request is still running is a 409.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or not request.user.is_authenticated:
+                return method(view, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({"error": f"{IDEMPOTENCY_HEADER} is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+            fingerprint = _fingerprint(request)
+            record, claimed = _claim(scope, request.user, hashlib.sha256(key.encode()).hexdigest(), fingerprint)
+
+            if not claimed:
+                if record is not None and record.fingerprint != fingerprint:
+                    return Response(
+                        {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if record is None or record.state == IdempotencyKey.IN_PROGRESS:
+                    return Response(
+                        {"error": f"A request with this {IDEMPOTENCY_HEADER} is still being processed."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return Response(
+                    record.response_data, status=record.status_code, headers={"Idempotent-Replayed": "true"},
+                )
+
+            try:
+                try:
+                    response = method(view, request, *args, **kwargs)
+                except Exception as exc:
+                    # Let DRF turn its own exceptions into responses so they
+                    # are stored; anything it does not handle is re-raised.
+                    response = view.handle_exception(exc)
+            except Exception:
+                record.delete()
+                raise
+
+            if response.status_code >= 500:
+                record.delete()
+            else:
+                record.state = IdempotencyKey.DONE
+                record.response_data = response.data
+                record.status_code = response.status_code
+                record.expires_at = timezone.now() + IDEMPOTENCY_TTL
+                record.save(update_fields=["state", "response_data", "status_code", "expires_at"])
+            return response
+        return wrapper
+    return decorator
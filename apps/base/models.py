@@ -1,4 +1,6 @@
 import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from apps.base.choices import StatusChoices
@@ -12,4 +14,27 @@ class BaseModel(models.Model):
     
     class Meta:
         abstract = True
-        
\ No newline at end of file
+
+
+class IdempotencyKey(models.Model):
+    """A claimed Idempotency-Key and, once the view has run, the response to replay."""
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+
+    scope = models.CharField(max_length=50)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key_hash = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, default=IN_PROGRESS)
+    response_data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "user", "key_hash"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key_hash[:12]} ({self.state})"
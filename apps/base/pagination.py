@@ -0,0 +1,179 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on a (timestamp, pk) pair.
+
+    Each page is a single `WHERE (ts, id) < (cursor) ORDER BY ts DESC, id DESC
+    LIMIT n+1` query, so page N costs the same as page 1 and no COUNT(*) runs.
+    Views pick the key with `cursor_ordering`; it needs a matching composite index.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    ordering = ("created_at", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = getattr(view, "cursor_ordering", self.ordering)
+        self.limit = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request, queryset.model)
+        ts_field, pk_field = self.fields
+
+        if self.reverse:
+            queryset = queryset.order_by(ts_field, pk_field)
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f"{ts_field}__gt": position[0]})
+                    | Q(**{ts_field: position[0], f"{pk_field}__gt": position[1]})
+                )
+        else:
+            queryset = queryset.order_by(f"-{ts_field}", f"-{pk_field}")
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f"{ts_field}__lt": position[0]})
+                    | Q(**{ts_field: position[0], f"{pk_field}__lt": position[1]})
+                )
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        self.page = results[:self.limit]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            timestamp = parse_datetime(data["p"][0])
+            pk = model._meta.get_field(self.fields[1]).to_python(data["p"][1])
+            if timestamp is None:
+                raise ValueError
+            return (timestamp, pk), bool(data.get("r"))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        ts_field, pk_field = self.fields
+        data = {"p": [getattr(obj, ts_field).isoformat(), str(getattr(obj, pk_field))]}
+        if reverse:
+            data["r"] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset cursor from a previous `next`/`previous` link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results per cursor page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class OptInCursorPagination(LimitOffsetPagination):
+    """
+    LimitOffsetPagination unless the client opts in with `?pagination=cursor`
+    (or follows a `?cursor=` link), in which case KeysetPagination is used.
+    """
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `cursor` for keyset pagination (no count, constant cost per page).",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+        ] + self.keyset_class().get_schema_operation_parameters(view)
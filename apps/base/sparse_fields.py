@@ -0,0 +1,73 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+EXPAND_PARAM = "expand"
+
+
+def _names(request, param):
+    value = request.query_params.get(param, "")
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def requested_fields(request, available, opt_in=()):
+    """
+    Field names to render for `?fields=`, `?omit=` and `?expand=`, or None
+    for all of them.
+
+    `fields` picks a subset, `expand` adds to it (e.g. a slim card plus
+    `pricing`) and `omit` removes from whatever is left. `opt_in` fields are
+    left out unless `fields` or `expand` names them. Only read requests are
+    narrowed; everything else just drops the `opt_in` fields.
+    """
+    available, opt_in = set(available), set(opt_in)
+    if request is None or request.method not in SAFE_METHODS:
+        return available - opt_in if opt_in else None
+
+    fields, omit, expand = (_names(request, param) for param in (FIELDS_PARAM, OMIT_PARAM, EXPAND_PARAM))
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit), (EXPAND_PARAM, expand)):
+        unknown = names - available
+        if unknown:
+            raise ValidationError({param: f"Unknown field(s): {', '.join(sorted(unknown))}"})
+
+    if not (fields or omit or opt_in - expand):
+        return None
+
+    selected = (fields | expand) if fields else available - (opt_in - expand)
+    return selected - omit
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Drops the fields the request did not ask for (see requested_fields).
+    Fields listed in `opt_in_fields` are only rendered when asked for.
+    """
+    opt_in_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = requested_fields(self.context.get("request"), self.fields, self.opt_in_fields)
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """
+    Applies select_related/prefetch_related only for relations the response
+    renders. `sparse_relations` maps a serializer field to
+    ("select_related" | "prefetch_related", lookup).
+    """
+    sparse_relations = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        opt_in = getattr(serializer_class, "opt_in_fields", ())
+        selected = requested_fields(self.request, {*serializer_class().fields, *opt_in}, opt_in)
+        for name, (method, lookup) in self.sparse_relations.items():
+            if selected is None or name in selected:
+                queryset = getattr(queryset, method)(lookup)
+        return queryset
@@ -1,3 +1,94 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.apartments.models import Apartment
+from apps.bookings.models import Booking
+from apps.user.models import User
+
+from .models import IdempotencyKey
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        host = User.objects.create_user(email="host@example.com", password="pw", first_name="Host", last_name="H")
+        self.guest = User.objects.create_user(email="guest@example.com", password="pw", first_name="Guest", last_name="G")
+        self.apartment = Apartment.objects.create(
+            host=host, title="Flat", description="d", property_type="apartment",
+            total_bedrooms=1, total_bathrooms=1, max_guests=4,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.day = timezone.localdate() + timedelta(days=30)
+
+    def book(self, start=0, nights=2, key="key-1"):
+        check_in = self.day + timedelta(days=start)
+        return self.client.post(
+            reverse("apartment-bookings", kwargs={"apartment_id": self.apartment.id}),
+            {
+                "apartment": self.apartment.id, "check_in": check_in,
+                "check_out": check_in + timedelta(days=nights), "guests_count": 1,
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.book()
+        retry = self.book()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_reusing_a_key_for_another_body_is_rejected(self):
+        self.book()
+
+        response = self.book(start=5)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_retry_while_in_progress_is_a_conflict(self):
+        self.book()
+        IdempotencyKey.objects.update(state=IdempotencyKey.IN_PROGRESS)
+
+        self.assertEqual(self.book().status_code, 409)
+
+    def test_raised_validation_errors_are_replayed(self):
+        booked = self.book(key="key-0").json()["id"]
+        rejected = self.book(start=1)
+        Booking.objects.get(pk=booked).delete()
+
+        retry = self.book(start=1)
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), rejected.json())
+
+    def test_expired_key_runs_again(self):
+        self.book()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.book(start=5)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.get().state, IdempotencyKey.DONE)
+
+    def test_keys_are_per_user(self):
+        self.book()
+        other = User.objects.create_user(email="other@example.com", password="pw", first_name="O", last_name="O")
+        self.client.force_authenticate(other)
+
+        response = self.book(start=5)
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
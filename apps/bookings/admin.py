@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, StripeEvent
 
 
 @admin.register(Booking)
@@ -12,3 +12,11 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ("apartment__title", "guest__email", "id")
     readonly_fields = ("created_at", "updated_at")
     ordering = ("-created_at",)
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "type", "received_at", "processed_at", "attempts", "next_attempt_at")
+    list_filter = ("type", "processed_at")
+    search_fields = ("event_id",)
+    readonly_fields = ("event_id", "type", "payload", "received_at", "processed_at", "attempts", "next_attempt_at", "last_error")
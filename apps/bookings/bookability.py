@@ -0,0 +1,50 @@
+from apps.apartments.models import Apartment, ApartmentPricing
+from apps.apartments.pricing import count_weekend_nights, quote
+
+from .occupancy import free_apartments
+
+# Why an apartment can't be booked, checked in this order (as BookingSerializer
+# and ApartmentBookingListCreateView would reject it).
+INACTIVE = "inactive"
+TOO_MANY_GUESTS = "too_many_guests"
+BOOKED = "booked"
+
+
+def check_stays(apartment_ids, check_in, check_out, guests=1):
+    """
+    {apartment_id: {"bookable", "reason", "quote"}} for one stay across many
+    apartments: one query for the apartments and their pricing, and the
+    cached occupancy bitmaps instead of an overlap query per apartment.
+    Unknown ids are left out; `quote` is None without pricing.
+    """
+    apartments = list(
+        Apartment.objects.filter(id__in=apartment_ids)
+        .select_related("pricing")
+        .only(
+            "id", "is_active", "max_guests",
+            "pricing__price_per_night", "pricing__weekend_price", "pricing__cleaning_fee",
+            "pricing__service_fee", "pricing__currency",
+        )
+    )
+    candidates = [a.id for a in apartments if a.is_active and guests <= a.max_guests]
+    free = free_apartments(candidates, check_in, check_out) if candidates else set()
+
+    nights = (check_out - check_in).days
+    weekend_nights = count_weekend_nights(check_in, check_out)
+    results = {}
+    for apartment in apartments:
+        if not apartment.is_active:
+            reason = INACTIVE
+        elif guests > apartment.max_guests:
+            reason = TOO_MANY_GUESTS
+        elif apartment.id not in free:
+            reason = BOOKED
+        else:
+            reason = None
+
+        try:
+            stay = quote(apartment.pricing, check_in, check_out, nights, weekend_nights)
+        except ApartmentPricing.DoesNotExist:
+            stay = None
+        results[apartment.id] = {"bookable": reason is None, "reason": reason, "quote": stay}
+    return results
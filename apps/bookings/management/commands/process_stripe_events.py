@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bookings.webhooks import BATCH_SIZE, process_all
+
+class Command(BaseCommand):
+    help = "Apply pending Stripe webhook events from the inbox, including failed ones whose retry is due"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--loop", type=float, metavar="SECONDS", help="Keep running, polling every SECONDS.")
+
+    def handle(self, *args, **options):
+        while True:
+            handled = process_all(options["batch_size"])
+            if handled or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Applied {handled} Stripe events"))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from apps.bookings.occupancy import prune_reserved_nights
+
+class Command(BaseCommand):
+    help = "Drop reserved nights and occupancy months in the past (run daily)"
+
+    def handle(self, *args, **options):
+        deleted = prune_reserved_nights()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} past reserved nights"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.bookings.occupancy import rebuild_occupancy
+
+class Command(BaseCommand):
+    help = "Recompute the per-month occupancy bitmaps from the reserved nights ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("apartment_ids", nargs="*", type=int, help="Limit the rebuild to these apartments.")
+
+    def handle(self, *args, **options):
+        created = rebuild_occupancy(options["apartment_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} occupancy months"))
@@ -0,0 +1,49 @@
+import json
+from datetime import datetime, time as dt_time
+
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.bookings.models import StripeEvent
+from apps.bookings.webhooks import process_all, requeue, store_event
+
+class Command(BaseCommand):
+    help = "Re-apply stored Stripe events, or pull missed ones from the Stripe API into the inbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_ids", nargs="*", help="Stripe event ids to replay.")
+        parser.add_argument("--failed", action="store_true", help="Replay events that ran out of attempts.")
+        parser.add_argument("--since", help="Replay events received on or after this date (YYYY-MM-DD).")
+        parser.add_argument("--from-stripe", action="store_true", help="With --since, also fetch events from the Stripe API.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            day = parse_date(options["since"])
+            if day is None:
+                raise CommandError("--since must be a date (YYYY-MM-DD).")
+            since = timezone.make_aware(datetime.combine(day, dt_time.min))
+
+        if options["from_stripe"]:
+            if since is None:
+                raise CommandError("--from-stripe needs --since.")
+            stripe.api_key = settings.STRIPE_SECRET_KEY
+            fetched = 0
+            for event in stripe.Event.list(created={"gte": int(since.timestamp())}).auto_paging_iter():
+                fetched += store_event(json.loads(str(event)))
+            self.stdout.write(f"Stored {fetched} new events from Stripe")
+
+        events = StripeEvent.objects.none()
+        if options["event_ids"]:
+            events |= StripeEvent.objects.filter(event_id__in=options["event_ids"])
+        if options["failed"]:
+            events |= StripeEvent.objects.filter(processed_at__isnull=True, attempts__gt=0)
+        if since is not None:
+            events |= StripeEvent.objects.filter(received_at__gte=since)
+
+        requeued = requeue(events)
+        applied = process_all()
+        self.stdout.write(self.style.SUCCESS(f"Requeued {requeued} events, applied {applied}"))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0014_apartment_created_index'),
+        ('bookings', '0003_payment_method_changed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['apartment', 'created_at', 'id'], name='booking_apt_created_idx'),
+        ),
+    ]
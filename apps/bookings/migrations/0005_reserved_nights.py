@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:42
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_reserved_nights(apps, schema_editor):
+    # Only nights from today on are kept. Bookings that already overlap keep
+    # their rows; the later one's clashing nights are skipped.
+    Booking = apps.get_model('bookings', 'Booking')
+    ReservedNight = apps.get_model('bookings', 'ReservedNight')
+    today = timezone.localdate()
+    bookings = Booking.objects.filter(status__in=('pending', 'confirmed'), check_out__gt=today).order_by('created_at')
+    for booking in bookings.iterator():
+        first = max(booking.check_in, today)
+        ReservedNight.objects.bulk_create(
+            [
+                ReservedNight(apartment_id=booking.apartment_id, night=first + timedelta(days=offset), booking_id=booking.pk)
+                for offset in range((booking.check_out - first).days)
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0018_apartment_image_variants'),
+        ('bookings', '0004_booking_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('apartment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reserved_nights', to='apartments.apartment')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reserved_nights', to='bookings.booking')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('apartment', 'night'), name='reserved_night_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_reserved_nights, migrations.RunPython.noop),
+    ]
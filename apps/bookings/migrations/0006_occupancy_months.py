@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:44
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_occupancy(apps, schema_editor):
+    ReservedNight = apps.get_model('bookings', 'ReservedNight')
+    OccupancyMonth = apps.get_model('bookings', 'OccupancyMonth')
+    masks = defaultdict(int)
+    for apartment_id, night in ReservedNight.objects.values_list('apartment_id', 'night').iterator():
+        masks[apartment_id, night.replace(day=1)] |= 1 << (night.day - 1)
+    OccupancyMonth.objects.bulk_create(
+        [OccupancyMonth(apartment_id=apartment_id, month=month, nights=nights) for (apartment_id, month), nights in masks.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apartments', '0018_apartment_image_variants'),
+        ('bookings', '0005_reserved_nights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('nights', models.PositiveIntegerField(default=0)),
+                ('apartment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_months', to='apartments.apartment')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('apartment', 'month'), name='occupancy_month_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
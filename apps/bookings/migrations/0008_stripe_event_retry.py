@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_stripe_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Set after a failure; empty means due now.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stripeevent',
+            index=models.Index(fields=['processed_at', 'next_attempt_at'], name='stripe_event_retry_idx'),
+        ),
+    ]
@@ -1,9 +1,22 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.utils import timezone
 import uuid
-from apps.apartments.models import Apartment, ApartmentPricing
-from decimal import Decimal
+from apps.apartments.models import Apartment
+from apps.apartments.pricing import stay_total
+
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+
+class NightsUnavailable(Exception):
+    """
+    Raised by Booking.save when another active booking holds one of its nights.
+    """
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -36,23 +49,148 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["apartment", "created_at", "id"], name="booking_apt_created_idx"),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.apartment.title} ({self.guest})"
 
     def is_active(self):
-        return self.status in ("pending", "confirmed")
+        return self.status in ACTIVE_STATUSES
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._held_stay = instance._stay()
+        return instance
+
+    def _stay(self):
+        # The nights this booking should hold in the ledger, as a comparable key.
+        return (self.apartment_id, self.check_in, self.check_out) if self.is_active() else None
+
+    def _wanted_nights(self):
+        # Past nights are not kept in the ledger (see occupancy.prune_reserved_nights).
+        if self._stay() is None:
+            return set()
+        first = max(self.check_in, timezone.localdate())
+        return {first + timedelta(days=offset) for offset in range((self.check_out - first).days)}
+
+    def clean(self):
+        super().clean()
+        if self.check_in and self.check_out and self.check_out <= self.check_in:
+            raise ValidationError({"check_out": "Check-out must be after check-in."})
+        if not self.apartment_id or not self._wanted_nights():
+            return
+        taken = ReservedNight.objects.filter(apartment_id=self.apartment_id, night__in=self._wanted_nights())
+        if self.pk:
+            taken = taken.exclude(booking_id=self.pk)
+        if taken.exists():
+            raise ValidationError("This apartment is already booked for some of the selected dates.")
+
+    def _sync_reserved_nights(self, adding):
+        from .occupancy import record_nights
+
+        stay = self._stay()
+        # {apartment_id: nights} currently in the ledger; a booking moved to
+        # another apartment releases everything it held on the old one.
+        held = defaultdict(set)
+        if not adding:
+            for apartment_id, night in self.reserved_nights.values_list("apartment_id", "night"):
+                held[apartment_id].add(night)
+        current = held.pop(self.apartment_id, set())
+        wanted = self._wanted_nights()
+        released, reserved = current - wanted, wanted - current
+
+        try:
+            with transaction.atomic():
+                if held:
+                    self.reserved_nights.exclude(apartment_id=self.apartment_id).delete()
+                if released:
+                    self.reserved_nights.filter(apartment_id=self.apartment_id, night__in=released).delete()
+                ReservedNight.objects.bulk_create(
+                    ReservedNight(apartment_id=self.apartment_id, night=night, booking=self) for night in reserved
+                )
+        except IntegrityError:
+            raise NightsUnavailable(f"Apartment {self.apartment_id} is already booked between {self.check_in} and {self.check_out}.")
+        for old_apartment_id, nights in held.items():
+            record_nights(old_apartment_id, (), nights)
+        record_nights(self.apartment_id, reserved, released)
+        self._held_stay = stay
 
     def save(self, *args, **kwargs):
         if not self.total_price:
-            try:
-                pricing = self.apartment.pricing
-                self.total_price = Decimal(pricing.price_per_night) * self.nights + Decimal(pricing.cleaning_fee) + Decimal(pricing.service_fee)
-            except ApartmentPricing.DoesNotExist:
-                self.total_price = Decimal('0.00')
+            self.total_price = stay_total(self.apartment, self.check_in, self.check_out)
 
         if self.provider_transaction_id:
             self.payment_status = "paid"
             self.status = "confirmed"
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+        # The ledger is written in the booking's transaction, so a conflicting
+        # night rolls back the booking as well.
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self._stay() != getattr(self, "_held_stay", None):
+                self._sync_reserved_nights(adding)
+
+
+class ReservedNight(models.Model):
+    """
+    One row per night held by a pending or confirmed booking. The unique
+    (apartment, night) constraint lets the database reject double bookings.
+    """
+    apartment = models.ForeignKey(Apartment, on_delete=models.CASCADE, related_name="reserved_nights")
+    night = models.DateField()
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="reserved_nights")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["apartment", "night"], name="reserved_night_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.apartment_id} {self.night}"
+
+
+class OccupancyMonth(models.Model):
+    """
+    Nights of one calendar month held by active bookings of an apartment,
+    as a bitmask maintained from the ReservedNight ledger (see .occupancy).
+    """
+    apartment = models.ForeignKey(Apartment, on_delete=models.CASCADE, related_name="occupancy_months")
+    month = models.DateField(help_text="First day of the month.")
+    nights = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["apartment", "month"], name="occupancy_month_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.apartment_id} {self.month:%Y-%m}"
+
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events, keyed by Stripe's event id so
+    redeliveries are stored once. Applied in batches by .webhooks.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="Set after a failure; empty means due now.")
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("received_at", "id")
+        indexes = [
+            models.Index(fields=["processed_at", "received_at"], name="stripe_event_pending_idx"),
+            models.Index(fields=["processed_at", "next_attempt_at"], name="stripe_event_retry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} ({self.type})"
\ No newline at end of file
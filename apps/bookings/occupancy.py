@@ -0,0 +1,163 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.apartments.availability import month_windows
+
+from .models import OccupancyMonth, ReservedNight
+
+OCCUPANCY_CACHE_TTL = 60 * 60
+
+# Each OccupancyMonth stores the nights held by active bookings as a bitmask:
+# bit d-1 is set when the night starting on day d of the month is taken.
+
+
+def _key(apartment_id, month):
+    return f"bookings:occupancy:{apartment_id}:{month:%Y-%m}"
+
+
+def night_masks(nights):
+    """
+    {first_of_month: mask} for an iterable of nights.
+    """
+    masks = defaultdict(int)
+    for night in nights:
+        masks[night.replace(day=1)] |= 1 << (night.day - 1)
+    return masks
+
+
+def stay_masks(check_in, check_out):
+    """
+    {first_of_month: mask} for the nights of [check_in, check_out), one entry per month.
+    """
+    masks = {}
+    for month_start, month_end in month_windows(check_in, check_out):
+        first, last = max(check_in, month_start), min(check_out, month_end)
+        masks[month_start] = ((1 << (last - first).days) - 1) << (first.day - 1)
+    return masks
+
+
+def record_nights(apartment_id, reserved=(), released=()):
+    """
+    Sets the `reserved` and clears the `released` nights of one apartment,
+    one UPDATE per touched month. Must run inside the transaction that
+    changed the ledger; the cached months are refreshed after commit.
+    """
+    reserve, release = night_masks(reserved), night_masks(released)
+    months = set(reserve) | set(release)
+    if not months:
+        return
+
+    OccupancyMonth.objects.bulk_create(
+        [OccupancyMonth(apartment_id=apartment_id, month=month, nights=0) for month in reserve],
+        ignore_conflicts=True,
+    )
+    for month in months:
+        OccupancyMonth.objects.filter(apartment_id=apartment_id, month=month).update(
+            nights=F("nights").bitand(~release.get(month, 0)).bitor(reserve.get(month, 0))
+        )
+    transaction.on_commit(lambda: _refresh(apartment_id, months))
+
+
+def _load(pairs):
+    apartment_ids = {apartment_id for apartment_id, _ in pairs}
+    months = {month for _, month in pairs}
+    stored = {
+        (apartment_id, month): nights
+        for apartment_id, month, nights in OccupancyMonth.objects
+        .filter(apartment_id__in=apartment_ids, month__in=months)
+        .values_list("apartment_id", "month", "nights")
+    }
+    return {pair: stored.get(pair, 0) for pair in pairs}
+
+
+def _refresh(apartment_id, months):
+    # Writers overwrite; readers only add(), so a reader holding an older
+    # value can never replace what a commit just wrote.
+    fresh = _load({(apartment_id, month) for month in months})
+    cache.set_many({_key(*pair): nights for pair, nights in fresh.items()}, OCCUPANCY_CACHE_TTL)
+
+
+def booked_masks(apartment_ids, months):
+    """
+    {(apartment_id, month): mask} for every pair, from the cache with one
+    query for the misses.
+    """
+    pairs = [(apartment_id, month) for apartment_id in apartment_ids for month in months]
+    keys = {pair: _key(*pair) for pair in pairs}
+    cached = cache.get_many(list(keys.values()))
+
+    masks, missing = {}, []
+    for pair, key in keys.items():
+        if key in cached:
+            masks[pair] = cached[key]
+        else:
+            missing.append(pair)
+
+    if missing:
+        loaded = _load(missing)
+        for pair, nights in loaded.items():
+            cache.add(keys[pair], nights, OCCUPANCY_CACHE_TTL)
+        masks.update(loaded)
+    return masks
+
+
+def free_apartments(apartment_ids, check_in, check_out):
+    """
+    The apartments with no pending or confirmed booking on any night of
+    [check_in, check_out), without reading the bookings table.
+    """
+    apartment_ids = list(apartment_ids)
+    wanted = stay_masks(check_in, check_out)
+    masks = booked_masks(apartment_ids, list(wanted))
+    return {
+        apartment_id for apartment_id in apartment_ids
+        if not any(masks[apartment_id, month] & mask for month, mask in wanted.items())
+    }
+
+
+def is_free(apartment_id, check_in, check_out):
+    return apartment_id in free_apartments([apartment_id], check_in, check_out)
+
+
+def prune_reserved_nights(today=None):
+    """
+    Drops ledger rows for nights before today and the occupancy months that
+    ended before this one; past nights can no longer be booked, so nothing
+    needs them. Two statements for the whole catalog.
+    """
+    today = today or timezone.localdate()
+    deleted, _ = ReservedNight.objects.filter(night__lt=today).delete()
+    OccupancyMonth.objects.filter(month__lt=today.replace(day=1)).delete()
+    return deleted
+
+
+def rebuild_occupancy(apartment_ids=None):
+    """
+    Recomputes the month masks from the ReservedNight ledger.
+    """
+    nights = ReservedNight.objects.all()
+    stored = OccupancyMonth.objects.all()
+    if apartment_ids is not None:
+        nights = nights.filter(apartment_id__in=apartment_ids)
+        stored = stored.filter(apartment_id__in=apartment_ids)
+
+    per_apartment = defaultdict(list)
+    for apartment_id, night in nights.values_list("apartment_id", "night"):
+        per_apartment[apartment_id].append(night)
+
+    rows = [
+        OccupancyMonth(apartment_id=apartment_id, month=month, nights=mask)
+        for apartment_id, apartment_nights in per_apartment.items()
+        for month, mask in night_masks(apartment_nights).items()
+    ]
+    with transaction.atomic():
+        stale = {_key(apartment_id, month) for apartment_id, month in stored.values_list("apartment_id", "month")}
+        stored.delete()
+        OccupancyMonth.objects.bulk_create(rows, batch_size=1000)
+        stale.update(_key(row.apartment_id, row.month) for row in rows)
+        transaction.on_commit(lambda: cache.delete_many(list(stale)))
+    return len(rows)
@@ -1,10 +1,15 @@
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from django.utils import timezone
-from decimal import Decimal
-from django.db.models import Q
 
-from .models import Booking
-from apps.apartments.models import Apartment, ApartmentPricing
+from .models import Booking, NightsUnavailable
+from apps.apartments.models import Apartment
+from apps.apartments.pricing import stay_total
+from apps.apartments.serializers import StayQuoteRequestSerializer
+
+from .bookability import BOOKED, INACTIVE, TOO_MANY_GUESTS
+
+BOOKED_MESSAGE = "The apartment is already booked for the selected dates."
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -62,38 +67,11 @@ class BookingSerializer(serializers.ModelSerializer):
                 f"Maximum guests allowed: {apartment.max_guests}"
             )
 
-        overlap_q = (
-            Q(check_in__lt=check_out) &
-            Q(check_out__gt=check_in) &
-            Q(status__in=["pending", "confirmed"])
-        )
-
-        conflicts = Booking.objects.filter(
-            apartment=apartment
-        ).filter(overlap_q)
-
-        if self.instance:
-            conflicts = conflicts.exclude(pk=self.instance.pk)
-
-        if conflicts.exists():
-            raise serializers.ValidationError(
-                "The apartment is already booked for the selected dates."
-            )
-
+        # Overlaps are rejected by the ReservedNight ledger when the booking is saved.
         return attrs
 
-    def _compute_total_price(self, apartment, nights):
-        try:
-            pricing = apartment.pricing
-            base_price = Decimal(pricing.price_per_night)
-            cleaning_fee = Decimal(pricing.cleaning_fee or 0)
-            service_fee = Decimal(pricing.service_fee or 0)
-        except ApartmentPricing.DoesNotExist:
-            base_price = Decimal("0.00")
-            cleaning_fee = Decimal("0.00")
-            service_fee = Decimal("0.00")
-
-        return (base_price * nights) + cleaning_fee + service_fee
+    def _compute_total_price(self, apartment, check_in, check_out):
+        return stay_total(apartment, check_in, check_out)
 
     def create(self, validated_data):
         check_in = validated_data["check_in"]
@@ -105,14 +83,17 @@ class BookingSerializer(serializers.ModelSerializer):
 
         validated_data["nights"] = nights
         validated_data["total_price"] = self._compute_total_price(
-            validated_data["apartment"], nights
+            validated_data["apartment"], check_in, check_out
         )
 
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             validated_data["guest"] = request.user
 
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except NightsUnavailable:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [BOOKED_MESSAGE]})
 
     def update(self, instance, validated_data):
         validated_data.pop("apartment", None)
@@ -128,6 +109,33 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Invalid booking duration.")
 
         instance.nights = nights
-        instance.total_price = self._compute_total_price(instance.apartment, nights)
+        instance.total_price = self._compute_total_price(instance.apartment, check_in, check_out)
+
+        try:
+            return super().update(instance, validated_data)
+        except NightsUnavailable:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [BOOKED_MESSAGE]})
+
+
+class BookabilityRequestSerializer(StayQuoteRequestSerializer):
+    breakdown = None
+    guests = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs["check_in"] < timezone.localdate():
+            raise serializers.ValidationError({"check_in": "check_in cannot be in the past."})
+        return attrs
+
+
+class StayPriceSerializer(serializers.Serializer):
+    currency = serializers.CharField()
+    nights = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
 
-        return super().update(instance, validated_data)
+class BookabilitySerializer(serializers.Serializer):
+    apartment = serializers.IntegerField()
+    bookable = serializers.BooleanField()
+    reason = serializers.ChoiceField(choices=[INACTIVE, TOO_MANY_GUESTS, BOOKED], allow_null=True)
+    quote = StayPriceSerializer(allow_null=True)
@@ -1,3 +1,284 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.apartments.models import Apartment, ApartmentPricing
+from apps.user.models import User
+
+from . import stripe_local, webhooks
+from .bookability import BOOKED, INACTIVE, TOO_MANY_GUESTS
+from .models import Booking, NightsUnavailable, ReservedNight, StripeEvent
+from .occupancy import is_free, prune_reserved_nights
+from .serializers import BOOKED_MESSAGE
+
+
+class BookingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(email="host@example.com", password="pw", first_name="Host", last_name="H")
+        self.guest = User.objects.create_user(email="guest@example.com", password="pw", first_name="Guest", last_name="G")
+        self.apartment = self.create_apartment("Flat")
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.day = timezone.localdate() + timedelta(days=30)
+
+    def create_apartment(self, title):
+        return Apartment.objects.create(
+            host=self.host, title=title, description="d", property_type="apartment",
+            total_bedrooms=1, total_bathrooms=1, max_guests=4,
+        )
+
+    def dates(self, start, nights):
+        check_in = self.day + timedelta(days=start)
+        return check_in, check_in + timedelta(days=nights)
+
+    def book(self, start, nights, apartment=None, **headers):
+        apartment = apartment or self.apartment
+        check_in, check_out = self.dates(start, nights)
+        return self.client.post(
+            reverse("apartment-bookings", kwargs={"apartment_id": apartment.id}),
+            {"apartment": apartment.id, "check_in": check_in, "check_out": check_out, "guests_count": 1},
+            format="json",
+            **headers,
+        )
+
+    def ledger(self, apartment=None):
+        return sorted(
+            ReservedNight.objects.filter(apartment=apartment or self.apartment).values_list("night", flat=True)
+        )
+
+
+class ReservedNightLedgerTests(BookingTestCase):
+    def test_booking_reserves_each_night(self):
+        response = self.book(0, 3)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.ledger(), [self.day + timedelta(days=offset) for offset in range(3)])
+
+    def test_overlapping_booking_is_rejected(self):
+        self.book(0, 3)
+        response = self.book(2, 3)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"non_field_errors": [BOOKED_MESSAGE]})
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(len(self.ledger()), 3)
+
+    def test_back_to_back_bookings_are_allowed(self):
+        self.assertEqual(self.book(0, 3).status_code, 201)
+        self.assertEqual(self.book(3, 2).status_code, 201)
+        self.assertEqual(len(self.ledger()), 5)
+
+    def test_cancelling_releases_nights(self):
+        booking_id = self.book(0, 3).json()["id"]
+
+        response = self.client.delete(reverse("booking-detail", kwargs={"id": booking_id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ledger(), [])
+        self.assertEqual(self.book(1, 1).status_code, 201)
+
+    def test_moving_into_a_conflict_is_rejected_and_keeps_the_nights(self):
+        self.book(5, 2)
+        booking_id = self.book(0, 3).json()["id"]
+        check_in, check_out = self.dates(4, 2)
+
+        response = self.client.put(
+            reverse("booking-detail", kwargs={"id": booking_id}),
+            {"apartment": self.apartment.id, "check_in": check_in, "check_out": check_out},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"non_field_errors": [BOOKED_MESSAGE]})
+        booking = Booking.objects.get(pk=booking_id)
+        self.assertEqual(booking.check_in, self.day)
+        self.assertEqual(len(booking.reserved_nights.all()), 3)
+
+    def test_conflict_rolls_back_the_booking_row(self):
+        self.book(0, 3)
+        check_in, check_out = self.dates(1, 1)
+
+        with self.assertRaises(NightsUnavailable):
+            Booking.objects.create(
+                apartment=self.apartment, guest=self.guest, check_in=check_in, check_out=check_out, nights=1,
+            )
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_moving_to_another_apartment_moves_the_nights(self):
+        other = self.create_apartment("Other")
+        booking = Booking.objects.get(pk=self.book(0, 3).json()["id"])
+        check_in, check_out = self.dates(0, 3)
+
+        booking.apartment = other
+        booking.save()
+
+        self.assertEqual(self.ledger(), [])
+        self.assertEqual(len(self.ledger(other)), 3)
+        self.assertTrue(is_free(self.apartment.id, check_in, check_out))
+        self.assertFalse(is_free(other.id, check_in, check_out))
+        self.assertEqual(self.book(0, 3).status_code, 201)
+
+    def test_admin_save_into_a_conflict_shows_a_form_error(self):
+        self.book(0, 3)
+        admin = User.objects.create_user(
+            email="admin@example.com", password="pw", first_name="A", last_name="A", is_staff=True, is_superuser=True,
+        )
+        self.client.force_login(admin)
+        check_in, check_out = self.dates(2, 2)
+
+        response = self.client.post(reverse("admin:bookings_booking_add"), {
+            "apartment": self.apartment.id, "guest": self.guest.id, "check_in": check_in, "check_out": check_out,
+            "nights": 2, "guests_count": 1, "status": "pending", "payment_status": "unpaid",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "already booked for some of the selected dates")
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_past_nights_are_pruned_and_not_reserved(self):
+        booking = Booking.objects.get(pk=self.book(0, 3).json()["id"])
+
+        prune_reserved_nights(today=self.day + timedelta(days=1))
+        self.assertEqual(self.ledger(), [self.day + timedelta(days=1), self.day + timedelta(days=2)])
+
+        # A stay already under way only holds the nights still to come.
+        booking.check_in = timezone.localdate() - timedelta(days=2)
+        booking.check_out = timezone.localdate() + timedelta(days=1)
+        booking.save()
+        self.assertEqual(self.ledger(), [timezone.localdate()])
+
+
+class BookabilityTests(BookingTestCase):
+    def check(self, apartments, start, nights, **params):
+        check_in, check_out = self.dates(start, nights)
+        response = self.client.get(reverse("bookability"), {
+            "ids": ",".join(str(apartment.id) for apartment in apartments),
+            "check_in": check_in, "check_out": check_out, **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return {result["apartment"]: result for result in response.json()}
+
+    def test_reports_why_each_apartment_cannot_be_booked(self):
+        self.book(0, 3)
+        free = self.create_apartment("Free")
+        inactive = self.create_apartment("Inactive")
+        Apartment.objects.filter(pk=inactive.pk).update(is_active=False)
+
+        results = self.check([self.apartment, free, inactive], 2, 2, guests=1)
+
+        self.assertEqual({apartment_id: result["reason"] for apartment_id, result in results.items()}, {
+            self.apartment.id: BOOKED, free.id: None, inactive.id: INACTIVE,
+        })
+        self.assertTrue(results[free.id]["bookable"])
+        self.assertEqual(self.check([free], 2, 2, guests=5)[free.id]["reason"], TOO_MANY_GUESTS)
+
+    def test_free_again_after_a_cancellation(self):
+        booking_id = self.book(0, 3).json()["id"]
+        self.assertFalse(self.check([self.apartment], 1, 1)[self.apartment.id]["bookable"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("booking-detail", kwargs={"id": booking_id}))
+
+        self.assertTrue(self.check([self.apartment], 1, 1)[self.apartment.id]["bookable"])
+
+    def test_quotes_the_stay_when_priced(self):
+        ApartmentPricing.objects.create(apartment=self.apartment, price_per_night="80.00", cleaning_fee="10.00")
+        unpriced = self.create_apartment("Unpriced")
+
+        results = self.check([self.apartment, unpriced], 0, 2)
+
+        self.assertEqual(results[self.apartment.id]["quote"], {"currency": "GBP", "nights": 2, "total": "170.00"})
+        self.assertIsNone(results[unpriced.id]["quote"])
+
+    def test_past_check_in_is_rejected(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        response = self.client.get(reverse("bookability"), {
+            "ids": str(self.apartment.id), "check_in": yesterday, "check_out": yesterday + timedelta(days=2),
+        })
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", STRIPE_EVENTS_IN_PROCESS=False)
+class StripeWebhookTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.booking = Booking.objects.get(pk=self.book(0, 2).json()["id"])
+
+    def test_delivered_event_is_stored_and_applied(self):
+        event = stripe_local.checkout_completed(self.booking, payment_intent="pi_1")
+
+        response = stripe_local.deliver(self.client, event)
+
+        self.assertEqual(response.status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "pending")
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.payment_status), ("confirmed", "paid"))
+        self.assertEqual(self.booking.provider_transaction_id, "pi_1")
+        self.assertIsNotNone(StripeEvent.objects.get(event_id=event["id"]).processed_at)
+
+    def test_redelivery_is_stored_once(self):
+        event = stripe_local.checkout_completed(self.booking)
+
+        responses = [stripe_local.deliver(self.client, event) for _ in range(3)]
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200])
+        self.assertEqual(StripeEvent.objects.filter(event_id=event["id"]).count(), 1)
+        self.assertEqual(webhooks.process_all(), 1)
+
+    def test_bad_signature_is_rejected(self):
+        event = stripe_local.checkout_completed(self.booking)
+
+        response = stripe_local.deliver(self.client, event, secret="whsec_other")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_unhandled_types_are_marked_processed(self):
+        stripe_local.deliver(self.client, stripe_local.build_event("customer.created", {"id": "cus_1"}))
+
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.assertFalse(StripeEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_failed_event_backs_off_without_blocking_the_batch(self):
+        other = Booking.objects.get(pk=self.book(5, 2).json()["id"])
+        failing = stripe_local.checkout_completed(self.booking)
+        stripe_local.deliver(self.client, failing)
+        stripe_local.deliver(self.client, stripe_local.checkout_completed(other))
+        save = Booking.save
+
+        def flaky_save(booking, *args, **kwargs):
+            if booking.pk == self.booking.pk:
+                raise RuntimeError("db hiccup")
+            return save(booking, *args, **kwargs)
+
+        with mock.patch.object(Booking, "save", flaky_save), self.assertLogs("apps.bookings.webhooks", "ERROR"):
+            self.assertEqual(webhooks.process_all(), 1)
+
+        other.refresh_from_db()
+        self.assertEqual(other.status, "confirmed")
+        stored = StripeEvent.objects.get(event_id=failing["id"])
+        self.assertEqual(stored.attempts, 1)
+        self.assertIsNone(stored.processed_at)
+        self.assertGreater(stored.next_attempt_at, timezone.now())
+        self.assertEqual(webhooks.next_retry_at(), stored.next_attempt_at)
+        self.assertEqual(webhooks.process_pending(), 0)
+
+        StripeEvent.objects.filter(pk=stored.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "confirmed")
+
+    def test_retry_delay_grows_and_is_capped(self):
+        self.assertEqual(webhooks.retry_delay(1), timedelta(seconds=webhooks.RETRY_BACKOFF))
+        self.assertEqual(webhooks.retry_delay(2), timedelta(seconds=2 * webhooks.RETRY_BACKOFF))
+        self.assertEqual(webhooks.retry_delay(50), timedelta(seconds=webhooks.MAX_RETRY_DELAY))
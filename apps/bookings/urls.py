@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     ApartmentBookingListCreateView,
+    BookabilityView,
     BookingDetailView,
     CreateCheckoutSessionView,
     stripe_webhook,
@@ -12,6 +13,11 @@ urlpatterns = [
         ApartmentBookingListCreateView.as_view(),
         name="apartment-bookings"
     ),
+    path(
+        "availability/",
+        BookabilityView.as_view(),
+        name="bookability"
+    ),
     path(
         "bookings/<uuid:id>/",
         BookingDetailView.as_view(),
@@ -10,8 +10,12 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 
 from apps.apartments.models import Apartment
+from apps.base.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from apps.base.pagination import OptInCursorPagination
 from apps.bookings.models import Booking
-from .serializers import BookingSerializer
+from .bookability import check_stays
+from .serializers import BookabilityRequestSerializer, BookabilitySerializer, BookingSerializer
+from .webhooks import construct_event, kick, store_event
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -24,10 +28,11 @@ class IsBookingGuestOrHost(permissions.BasePermission):
 class ApartmentBookingListCreateView(generics.ListCreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
 
     def get_queryset(self):
         apartment_id = self.kwargs.get("apartment_id")
-        return Booking.objects.filter(apartment_id=apartment_id).order_by("-created_at")
+        return Booking.objects.filter(apartment_id=apartment_id).order_by("-created_at", "-id")
 
     def get_serializer_context(self):
         return {"request": self.request}
@@ -42,8 +47,10 @@ class ApartmentBookingListCreateView(generics.ListCreateAPIView):
     @swagger_auto_schema(
         operation_summary="Create a booking for an apartment",
         request_body=BookingSerializer,
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={201: BookingSerializer}
     )
+    @idempotent("booking-create")
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -98,9 +105,38 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
         booking.save(update_fields=["status"])
         return Response(BookingSerializer(booking).data, status=status.HTTP_200_OK)
 
+class BookabilityView(APIView):
+    """
+    Whether one stay can be booked, and its price, for many apartments at once.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Check a stay against many apartments",
+        query_serializer=BookabilityRequestSerializer,
+        responses={200: BookabilitySerializer(many=True)},
+    )
+    def get(self, request):
+        params = BookabilityRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = params.validated_data["ids"]
+        stays = check_stays(
+            ids,
+            params.validated_data["check_in"],
+            params.validated_data["check_out"],
+            params.validated_data["guests"],
+        )
+        results = [{"apartment": apartment_id, **stays[apartment_id]} for apartment_id in ids if apartment_id in stays]
+        return Response(BookabilitySerializer(results, many=True).data)
+
 class CreateCheckoutSessionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @swagger_auto_schema(
+        operation_summary="Create a Stripe checkout session for a booking",
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
+    )
+    @idempotent("checkout-session")
     def post(self, request, booking_id):
         booking = get_object_or_404(Booking, id=booking_id, guest=request.user)
         
@@ -137,33 +173,17 @@ class CreateCheckoutSessionView(APIView):
 
 @csrf_exempt
 def stripe_webhook(request):
-    payload = request.body
-    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-    endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
-
+    """
+    Verifies and stores the event, then acks; see webhooks.process_pending
+    for how it is applied. Redeliveries of a stored event are acked as-is.
+    """
     try:
-        event = stripe.Webhook.construct_event(
-            payload=payload,
-            sig_header=sig_header,
-            secret=endpoint_secret
-        )
+        event = construct_event(request.body, request.META.get('HTTP_STRIPE_SIGNATURE'))
     except (ValueError, stripe.error.SignatureVerificationError):
         return HttpResponse(status=400)
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        booking_id = session.get('metadata', {}).get('booking_id')
-        payment_intent_id = session.get('payment_intent')
-
-        if booking_id:
-            try:
-                booking = Booking.objects.get(id=booking_id)
-                booking.payment_status = "paid"
-                booking.status = "confirmed"
-                booking.provider_transaction_id = payment_intent_id
-                booking.save(update_fields=["payment_status", "status", "provider_transaction_id"])
-            except Booking.DoesNotExist:
-                return HttpResponse(status=404)
+    if store_event(event) and settings.STRIPE_EVENTS_IN_PROCESS:
+        transaction.on_commit(kick)
 
     return HttpResponse(status=200)
 
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import Booking, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# A failed event waits RETRY_BACKOFF * 2 ** (attempts - 1) seconds, capped at MAX_RETRY_DELAY.
+RETRY_BACKOFF = 30
+MAX_RETRY_DELAY = 60 * 60
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def _due(now):
+    return StripeEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS).filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+    )
+
+
+def construct_event(payload, sig_header):
+    """
+    Verifies the signature and returns the event as plain JSON.
+    Raises ValueError or stripe.error.SignatureVerificationError.
+    """
+    stripe.Webhook.construct_event(payload=payload, sig_header=sig_header, secret=settings.STRIPE_WEBHOOK_SECRET)
+    return json.loads(payload)
+
+
+def store_event(event):
+    """
+    Adds a verified event to the inbox. Returns False for a redelivery of an event already stored.
+    """
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"], defaults={"type": event["type"], "payload": event},
+    )
+    return created
+
+
+def _checkout_completed(events):
+    # Later events for the same booking win.
+    paid = {}
+    for event in events:
+        session = event.payload["data"]["object"]
+        try:
+            booking_id = uuid.UUID((session.get("metadata") or {}).get("booking_id") or "")
+        except ValueError:
+            logger.warning("Stripe event %s has no valid booking_id", event.event_id)
+            continue
+        paid[booking_id] = session.get("payment_intent")
+
+    bookings = Booking.objects.select_related("apartment").in_bulk(list(paid))
+    for booking_id, payment_intent_id in paid.items():
+        booking = bookings.get(booking_id)
+        if booking is None:
+            logger.warning("Stripe checkout for unknown booking %s", booking_id)
+            continue
+        if booking.payment_status == "paid" and booking.provider_transaction_id == payment_intent_id:
+            continue
+        booking.payment_status = "paid"
+        booking.status = "confirmed"
+        booking.provider_transaction_id = payment_intent_id
+        booking.save(update_fields=["payment_status", "status", "provider_transaction_id"])
+
+
+# Event type -> function applying a list of StripeEvents of that type.
+HANDLERS = {
+    "checkout.session.completed": _checkout_completed,
+}
+
+
+def _apply(handler, events):
+    """
+    Runs `handler` over the whole batch in a savepoint; if that fails, over
+    each event on its own so one bad event doesn't hold back the rest.
+    Returns (applied, [(event, error)]).
+    """
+    try:
+        with transaction.atomic():
+            handler(events)
+        return events, []
+    except Exception as exc:
+        if len(events) == 1:
+            logger.exception("Applying Stripe event %s failed", events[0].event_id)
+            return [], [(events[0], repr(exc))]
+
+    applied, failed = [], []
+    for event in events:
+        ok, errors = _apply(handler, [event])
+        applied.extend(ok)
+        failed.extend(errors)
+    return applied, failed
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """
+    Applies up to `batch_size` due events, oldest first, in one transaction
+    per event type; event types without a handler are just marked
+    processed. A failed event is retried after retry_delay(attempts), up to
+    MAX_ATTEMPTS. Returns how many events were applied.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            _due(now)
+            .select_for_update(skip_locked=True)
+            .order_by("received_at", "id")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        by_type = {}
+        for event in batch:
+            by_type.setdefault(event.type, []).append(event)
+
+        done, failed = [], []
+        for event_type, events in by_type.items():
+            handler = HANDLERS.get(event_type)
+            if handler is None:
+                done.extend(events)
+                continue
+            applied, errors = _apply(handler, events)
+            done.extend(applied)
+            failed.extend(errors)
+
+        StripeEvent.objects.filter(pk__in=[event.pk for event in done]).update(
+            processed_at=now, next_attempt_at=None, attempts=F("attempts") + 1, last_error="",
+        )
+        for event, error in failed:
+            StripeEvent.objects.filter(pk=event.pk).update(
+                attempts=F("attempts") + 1, last_error=error, next_attempt_at=now + retry_delay(event.attempts + 1),
+            )
+    return len(done)
+
+
+def process_all(batch_size=BATCH_SIZE):
+    """
+    Runs process_pending until a pass applies nothing. Failed events are
+    pushed into the future, so they are never retried within one call.
+    """
+    applied = 0
+    while True:
+        count = process_pending(batch_size)
+        if not count:
+            return applied
+        applied += count
+
+
+def next_retry_at():
+    """
+    When the earliest failed event becomes due again, or None.
+    """
+    return (
+        StripeEvent.objects
+        .filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS, next_attempt_at__isnull=False)
+        .aggregate(due=Min("next_attempt_at"))["due"]
+    )
+
+
+def requeue(queryset):
+    """
+    Marks events as unprocessed and due now, with a fresh attempt budget; returns how many.
+    """
+    return queryset.update(processed_at=None, attempts=0, last_error="", next_attempt_at=None)
+
+
+_executor = None
+_executor_pid = None
+_scheduled = False
+_retry_timer = None
+_guard = threading.Lock()
+
+
+def _schedule_retry(due):
+    # One timer per process, for the earliest failed event; it kicks the worker again.
+    global _retry_timer
+    delay = max((due - timezone.now()).total_seconds(), 0)
+    with _guard:
+        if _retry_timer is not None and _retry_timer.is_alive():
+            if _retry_timer.due <= due:
+                return
+            _retry_timer.cancel()
+        _retry_timer = threading.Timer(delay, kick)
+        _retry_timer.due = due
+        _retry_timer.daemon = True
+        _retry_timer.start()
+
+
+def _drain():
+    global _scheduled
+    with _guard:
+        _scheduled = False
+    try:
+        process_all()
+        due = next_retry_at()
+        if due is not None:
+            _schedule_retry(due)
+    except Exception:
+        logger.exception("Stripe event worker crashed")
+    finally:
+        connections.close_all()
+
+
+def kick():
+    """
+    Schedules a drain of the inbox on this process's single worker thread.
+    Calls while one is already scheduled are coalesced.
+    """
+    global _executor, _executor_pid, _scheduled
+    with _guard:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stripe-events")
+            _executor_pid = os.getpid()
+            _scheduled = False
+        if _scheduled:
+            return
+        _scheduled = True
+    _executor.submit(_drain)
@@ -1,15 +1,21 @@
+import logging
+from datetime import timedelta
+
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mail
 from django.conf import settings
 
 from apps.user.models import User
+from apps.apartments.availability import availability_updated
 from apps.apartments.models import Apartment, ApartmentAvailability
 from apps.bookings.models import Booking
 from .models import Notification
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
 
+logger = logging.getLogger(__name__)
+
 @receiver(post_save, sender=User)
 def welcome_notification(sender, instance, created, **kwargs):
     if created:
@@ -65,46 +71,74 @@ def apartment_verified_notification(sender, instance, **kwargs):
         msg.send(fail_silently=False)
 
 
-@receiver(post_save, sender=ApartmentAvailability)
-def apartment_available_notification(sender, instance, **kwargs):
-    if not instance.is_available:
-        return
-
-    apartment = instance.apartment
-    users = User.objects.all()
-    notifications = []
-
-    for user in users:
-        notifications.append(Notification(
+def _announce_availability(apartment, when):
+    """
+    Tells every user that `apartment` is available `when`: the notifications
+    go in one bulk insert and the emails over a single connection. A failed
+    email is logged, never raised, so it can't fail the request that saved
+    the availability.
+    """
+    users = list(User.objects.only("id", "email", "first_name"))
+    Notification.objects.bulk_create([
+        Notification(
             user=user,
             title="Apartment Available 🏡",
-            message=f"{apartment.title} is available on {instance.date}.",
+            message=f"{apartment.title} is available on {when}.",
             notification_type="apartment_available",
             target_audience="user",
             apartment_id=apartment.id,
-        ))
+        )
+        for user in users
+    ])
 
-        html_content = render_to_string("emails/apartment_available.html", {
-            "user": user,
-            "apartment": apartment,
-            "availability": instance
-        })
+    try:
+        with get_connection() as connection:
+            for user in users:
+                html_content = render_to_string("emails/apartment_available.html", {
+                    "user": user,
+                    "apartment": apartment,
+                    "availability": {"date": when},
+                })
+                msg = EmailMultiAlternatives(
+                    subject=f"Apartment Available: {apartment.title}",
+                    body=f"{apartment.title} is available on {when}",
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[user.email],
+                    connection=connection,
+                )
+                msg.attach_alternative(html_content, "text/html")
+                try:
+                    msg.send()
+                except Exception:
+                    logger.warning("Availability email to %s failed", user.email, exc_info=True)
+    except Exception:
+        logger.exception("Sending availability emails for apartment %s failed", apartment.id)
+
+
+@receiver(post_save, sender=ApartmentAvailability)
+def apartment_available_notification(sender, instance, **kwargs):
+    if not instance.is_available:
+        return
+    _announce_availability(instance.apartment, instance.date)
 
-        msg = EmailMultiAlternatives(
-            subject=f"Apartment Available: {apartment.title}",
-            body=f"{apartment.title} is available on {instance.date}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email],
-        )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send(fail_silently=False)
 
-    Notification.objects.bulk_create(notifications)
+@receiver(availability_updated)
+def apartment_availability_updated_notification(sender, apartment_id, ranges, **kwargs):
+    # One notification/email per user for a whole bulk update, not one per night.
+    opened = [(start, end) for start, end, is_available in ranges if is_available]
+    if not opened:
+        return
+
+    dates = ", ".join(
+        str(start) if end - start == timedelta(days=1) else f"{start} to {end - timedelta(days=1)}"
+        for start, end in opened
+    )
+    _announce_availability(Apartment.objects.get(pk=apartment_id), dates)
 
 @receiver(post_save, sender=Booking)
 def booking_confirmed_notification(sender, instance, created, **kwargs):
     if created:
-        guest = instance.user
+        guest = instance.guest
         host = instance.apartment.host
 
         # Guest notification
@@ -153,7 +187,7 @@ def booking_cancelled_notification(sender, instance, **kwargs):
     if instance.status != "cancelled":
         return
 
-    guest = instance.user
+    guest = instance.guest
     host = instance.apartment.host
 
     # Guest
@@ -1,3 +1,61 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.apartments.availability import set_availability, upsert_availability
+from apps.apartments.models import Apartment
+from apps.user.models import User
+
+from .models import Notification
+
+
+class AvailabilityNotificationTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(email="host@example.com", password="pw", first_name="Host", last_name="H")
+        self.guest = User.objects.create_user(email="guest@example.com", password="pw", first_name="Guest", last_name="G")
+        self.apartment = Apartment.objects.create(
+            host=self.host, title="Flat", description="d", property_type="apartment",
+            total_bedrooms=1, total_bathrooms=1, max_guests=2,
+        )
+        self.today = timezone.localdate()
+        Notification.objects.all().delete()
+        mail.outbox = []
+
+    def upsert(self, spans):
+        with self.captureOnCommitCallbacks(execute=True):
+            return upsert_availability(self.apartment.id, spans)
+
+    def test_announces_only_the_submitted_available_spans(self):
+        start = self.today + timedelta(days=10)
+        set_availability(self.apartment.id, start, start + timedelta(days=10), True)
+
+        self.upsert([
+            (start, start + timedelta(days=2), True),
+            (start + timedelta(days=5), start + timedelta(days=6), False),
+        ])
+
+        notification = Notification.objects.filter(user=self.guest).get()
+        self.assertEqual(
+            notification.message,
+            f"{self.apartment.title} is available on {start} to {start + timedelta(days=1)}.",
+        )
+        self.assertEqual(len(mail.outbox), User.objects.count())
+
+    def test_blocking_only_sends_nothing(self):
+        start = self.today + timedelta(days=3)
+        self.upsert([(start, start + timedelta(days=2), False)])
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_email_failure_does_not_fail_the_update(self):
+        start = self.today + timedelta(days=3)
+        with mock.patch("django.core.mail.EmailMessage.send", side_effect=OSError("smtp down")), \
+                self.assertLogs("apps.notifications.signals", "WARNING"):
+            ranges = self.upsert([(start, start + timedelta(days=1), True)])
 
-# Create your tests here.
+        self.assertEqual(ranges, [(start, start + timedelta(days=1), True)])
+        self.assertEqual(Notification.objects.count(), User.objects.count())
@@ -19,6 +19,9 @@ class Review(models.Model):
     class Meta:
         unique_together = ("apartment", "user")  # A user reviews once
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['apartment', 'created_at', 'id'], name='review_apt_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.rating}★ by {self.user} on {self.apartment.title}"
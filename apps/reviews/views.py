@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 
 from apps.apartments.models import Apartment
+from apps.base.pagination import OptInCursorPagination
 from .models import Review
 from .serializers import ReviewSerializer
 
@@ -10,11 +11,12 @@ from .serializers import ReviewSerializer
 class ReviewListCreateView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
     queryset = Review.objects.none()
 
     def get_queryset(self):
         apartment_id = self.kwargs["apartment_id"]
-        return Review.objects.filter(apartment_id=apartment_id)
+        return Review.objects.filter(apartment_id=apartment_id).order_by("-created_at", "-id")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
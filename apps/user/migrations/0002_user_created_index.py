@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created', 'id'], name='user_created_idx'),
+        ),
+    ]
@@ -21,6 +21,11 @@ class User(BaseModel, AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ["first_name", "last_name",]
 
     objects = UserManager() 
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created", "id"], name="user_created_idx"),
+        ]
     
     def __str__(self):
         return self.first_name
@@ -8,6 +8,7 @@ from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
 from apps.base.account_utils import send_otp_email, set_user_otp
+from apps.base.pagination import OptInCursorPagination
 from apps.user.serializers import ChangePasswordSerializer, LoginSerializer, OTPVerificationSerializer, PasswordResetCompleteSerializer, PasswordResetRequestSerializer, UserCreateSerializer, UserDetailSerializer, UserSerializer, UserUpdateSerializer
 
 
@@ -16,8 +17,10 @@ User = get_user_model()
 
 @extend_schema(tags=["Users"])
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.exclude(status='DELETED')
+    queryset = User.objects.exclude(status='DELETED').order_by("-created", "-id")
     permission_classes = [IsAuthenticated, permissions.IsAdminUser]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("created", "id")
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "apps.bookings",
     "apps.reviews",
     "apps.notifications",
+    "apps.base",
     'sslserver',
     
 ]
@@ -117,6 +118,15 @@ DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Apartment images are spooled here and uploaded in the background (apps.apartments.uploads).
+IMAGE_UPLOADER = os.getenv("IMAGE_UPLOADER", "apps.apartments.uploads.CloudinaryUploader")
+IMAGE_SPOOL_DIR = os.getenv("IMAGE_SPOOL_DIR", BASE_DIR / "media" / "spool")
+IMAGE_LOCAL_STORAGE_DIR = os.getenv("IMAGE_LOCAL_STORAGE_DIR", MEDIA_ROOT / "uploads")
+IMAGE_LOCAL_STORAGE_URL = os.getenv("IMAGE_LOCAL_STORAGE_URL", MEDIA_URL + "uploads/")
+IMAGE_UPLOAD_WORKERS = int(os.getenv("IMAGE_UPLOAD_WORKERS", 2))
+IMAGE_UPLOAD_QUEUE_SIZE = int(os.getenv("IMAGE_UPLOAD_QUEUE_SIZE", 32))
+IMAGE_UPLOAD_RETRIES = int(os.getenv("IMAGE_UPLOAD_RETRIES", 3))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -184,6 +194,18 @@ else:
         }
     }
 
+# In-process tier in front of the shared cache for catalog reads (apps.apartments.local_cache).
+CATALOG_LOCAL_CACHE_ENABLED = os.getenv("CATALOG_LOCAL_CACHE_ENABLED", "true").lower() == "true"
+CATALOG_LOCAL_CACHE_MAX_BYTES = int(os.getenv("CATALOG_LOCAL_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CATALOG_LOCAL_CACHE_TTL = int(os.getenv("CATALOG_LOCAL_CACHE_TTL", 30))
+
+# Warm the catalog cache when a worker boots; one worker does it under a cache lock (apps.apartments.warmup).
+CATALOG_WARM_ON_START = os.getenv("CATALOG_WARM_ON_START", "false").lower() == "true"
+CATALOG_WARM_WORKERS = int(os.getenv("CATALOG_WARM_WORKERS", 4))
+
+# Currency ApartmentSearchIndex.price_base is kept in, for cross-currency price filters and sorting.
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "GBP")
+
 RATELIMIT_USE_CACHE = "default"
 RATELIMIT_ENABLE = True
 
@@ -193,6 +215,10 @@ SESSION_CACHE_ALIAS = "default"
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
 STRIPE_CURRENCY = os.getenv("STRIPE_CURRENCY", "usd")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# Webhook events are stored on receipt and applied by an in-process worker;
+# set to 0 when a separate `manage.py process_stripe_events` loop does it.
+STRIPE_EVENTS_IN_PROCESS = os.getenv("STRIPE_EVENTS_IN_PROCESS", "1") == "1"
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587